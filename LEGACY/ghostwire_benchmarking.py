@@ -1,11 +1,13 @@
 import argparse
 import asyncio
+import logging
 
 # USAGE:
 # python ghostwire-benchmarking.py --controller http://localhost:8000 --repeat 1000000
 # python ghostwire-benchmarking.py --controller http://localhost:8000 --threads 16 --repeat 100
 import os
 import time
+from statistics import fmean
 
 import httpx
 import numpy as np
@@ -33,21 +35,26 @@ TEXTS = {
 
 CONTROLLER_ROUTES = []
 
+log = logging.getLogger("ghostwire")
+
 
 # =========================
 # Embedding helpers
 # =========================
-async def embed_text(model: str, text: str):
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        start = time.perf_counter()
-        resp = await client.post(
-            f"{OLLAMA_URL}/api/embeddings", json={"model": model, "prompt": text}
-        )
-        latency = time.perf_counter() - start
-        resp.raise_for_status()
-        data = resp.json()
-        vec = np.array(data.get("embedding", []))
-        return latency, vec
+async def embed_text(model: str, text: str, client: httpx.AsyncClient | None = None):
+    # Callers issuing many requests should pass a shared client to reuse connections
+    if client is None:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            return await embed_text(model, text, client)
+    start = time.perf_counter()
+    resp = await client.post(
+        f"{OLLAMA_URL}/api/embeddings", json={"model": model, "prompt": text}
+    )
+    latency = time.perf_counter() - start
+    resp.raise_for_status()
+    data = resp.json()
+    vec = np.array(data.get("embedding", []))
+    return latency, vec
 
 
 def compute_ghostwire_score(latency, stability, mem_usage):
@@ -88,7 +95,7 @@ async def controller_embed(text: str):
         resp = await client.post(f"{CONTROLLER_URL}/v1/embeddings", json=payload)
         latency = time.perf_counter() - start
 
-        print(f"[DEBUG] controller /v1/embeddings returned {resp.status_code}")
+        log.debug("controller /v1/embeddings returned %s", resp.status_code)
         if not resp.text.strip():
             raise RuntimeError("Empty response from controller /v1/embeddings")
 
@@ -152,21 +159,29 @@ async def run_benchmark():
     print(f"🔍 Starting benchmark for models: {MODELS}")
     print("=" * 80)
     results = []
-    for model in MODELS:
-        print(f"\n📦 Testing model: {model}")
-        for label, text in TEXTS.items():
-            try:
-                before_mem = psutil.virtual_memory().used / (1024**3)
-                latency, vec = await embed_text(model, text)
-                after_mem = psutil.virtual_memory().used / (1024**3)
-                mem_diff = after_mem - before_mem
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        # Models run one after another so they never compete for the server;
+        # only one model's texts overlap, and memory is attributed per model
+        for model in MODELS:
+            print(f"\n📦 Testing model: {model}")
+            before_mem = psutil.virtual_memory().used / (1024**3)
+            outcomes = await asyncio.gather(
+                *[embed_text(model, text, client) for text in TEXTS.values()],
+                return_exceptions=True,
+            )
+            after_mem = psutil.virtual_memory().used / (1024**3)
+            mem_diff = after_mem - before_mem
+
+            for label, outcome in zip(TEXTS, outcomes, strict=True):
+                if isinstance(outcome, Exception):
+                    print(f"  {label:<8} | ERROR: {outcome}")
+                    continue
+                latency, vec = outcome
                 ghostwire_score = compute_ghostwire_score(latency, 1.0, mem_diff)
                 results.append((model, label, latency, len(vec), mem_diff))
                 print(
                     f"  {label:<8} | {latency:.3f}s | dim={len(vec)} | Δmem={mem_diff:.3f} GB | Ghostwire={ghostwire_score:.3f}"
                 )
-            except Exception as e:
-                print(f"  {label:<8} | ERROR: {e}")
 
     print("\n✅ Benchmark complete.\n")
     print(
@@ -188,26 +203,27 @@ def cosine_similarity(a, b):
 async def test_stability():
     print("\n🧠 Measuring embedding stability (cosine similarity across runs):")
     print("=" * 80)
-    for model in MODELS:
-        try:
-            runs = []
-            for _ in range(3):
-                _, vec = await embed_text(model, TEXTS["short"])
-                runs.append(vec)
-            sims = [
-                cosine_similarity(runs[i], runs[j])
-                for i in range(3)
-                for j in range(i + 1, 3)
-            ]
-            avg_sim = np.mean(sims)
-            ghostwire_score = compute_ghostwire_score(
-                latency=1.0, stability=avg_sim, mem_usage=0.5
-            )
-            print(
-                f"  {model:<20} | avg cosine similarity: {avg_sim:.4f} | Ghostwire score: {ghostwire_score:.3f}"
-            )
-        except Exception as e:
-            print(f"  {model:<20} | ERROR: {e}")
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        for model in MODELS:
+            try:
+                outcomes = await asyncio.gather(
+                    *[embed_text(model, TEXTS["short"], client) for _ in range(3)]
+                )
+                runs = [vec for _, vec in outcomes]
+                sims = [
+                    cosine_similarity(runs[i], runs[j])
+                    for i in range(3)
+                    for j in range(i + 1, 3)
+                ]
+                avg_sim = fmean(sims)
+                ghostwire_score = compute_ghostwire_score(
+                    latency=1.0, stability=avg_sim, mem_usage=0.5
+                )
+                print(
+                    f"  {model:<20} | avg cosine similarity: {avg_sim:.4f} | Ghostwire score: {ghostwire_score:.3f}"
+                )
+            except Exception as e:
+                print(f"  {model:<20} | ERROR: {e}")
 
 
 # =========================
@@ -219,23 +235,40 @@ async def run_concurrent_benchmark(num_threads: int, repeat: int):
     )
     print("=" * 80)
 
-    async def worker(worker_id: int):
-        total_latency = 0
-        for _ in range(repeat):
-            latency, _ = await embed_text("granite-embedding", TEXTS["short"])
-            total_latency += latency
-        avg_latency = total_latency / repeat
-        print(f"Worker {worker_id:02d} avg latency: {avg_latency:.3f}s")
-        return avg_latency
+    sem = asyncio.Semaphore(num_threads)
+    limits = httpx.Limits(
+        max_connections=num_threads, max_keepalive_connections=num_threads
+    )
 
-    start = time.perf_counter()
-    latencies = await asyncio.gather(*[worker(i) for i in range(num_threads)])
-    duration = time.perf_counter() - start
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+
+        async def timed_embed(sem: asyncio.Semaphore) -> float:
+            async with sem:
+                latency, _ = await embed_text(
+                    "granite-embedding", TEXTS["short"], client
+                )
+                return latency
+
+        async def worker(worker_id: int, sem: asyncio.Semaphore):
+            worker_latencies = await asyncio.gather(
+                *[asyncio.create_task(timed_embed(sem)) for _ in range(repeat)]
+            )
+            avg_latency = fmean(worker_latencies)
+            print(f"Worker {worker_id:02d} avg latency: {avg_latency:.3f}s")
+            return worker_latencies
+
+        start = time.perf_counter()
+        per_worker = await asyncio.gather(*[worker(i, sem) for i in range(num_threads)])
+        duration = time.perf_counter() - start
+
+    latencies = np.concatenate(per_worker)
+    total = num_threads * repeat
     print("=" * 80)
-    print(f"🏁 Completed {num_threads * repeat} requests in {duration:.2f}s total")
-    print(f"🧮 Average per request: {duration / (num_threads * repeat):.4f}s")
+    print(f"🏁 Completed {total} requests in {duration:.2f}s total")
+    print(f"⚡️ Aggregate throughput: {total / duration:.2f} req/s")
     print(
-        f"📈 Per-thread avg latency: {np.mean(latencies):.4f}s (std {np.std(latencies):.4f})"
+        f"📈 Latency mean {np.mean(latencies):.4f}s | "
+        f"P95 {np.quantile(latencies, 0.95):.4f}s (std {np.std(latencies):.4f})"
     )
 
 
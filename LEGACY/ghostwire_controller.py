@@ -12,15 +12,18 @@ Purpose
 - Etch the conversation back into the archive.
 
 Notes
-- Vectors are normalized and stored as BLOBs; HNSW keeps hot neighbors in RAM.
+- Vectors are normalized and stored as int8 BLOBs with a float32 scale; HNSW
+  keeps hot neighbors in RAM as float32.
 - Streaming uses Ollama's JSONL /api/generate protocol; only `response` chunks
   are yielded to callers. When `done` appears, the ritual ends.
 - Environment variables shape the conduit (REMOTE_OLLAMA_URL, MODEL, EMBED_DIM, DB_PATH).
 """
 
 import atexit
+import base64
 import json
 import logging
+import math
 import os
 import re
 import sqlite3
@@ -31,9 +34,10 @@ from typing import Any
 import hnswlib
 import httpx
 import numpy as np
+import orjson
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, StreamingResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, field_validator
 
 #
 #
@@ -65,10 +69,42 @@ EMBED_MODELS = os.getenv(
 if not DEBUG_MODE:
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
+# Hot-path diagnostics go through this logger at DEBUG with lazy %-formatting,
+# so per-request lines cost nothing unless DEBUG_MODE is on.
+log = logging.getLogger("ghostwire")
+
 logging.info(f"REMOTE_OLLAMA_URL = {REMOTE_OLLAMA_URL}")
 logging.info(f"OLLAMA_URL = {OLLAMA_URL}")
 
 
+async def _iter_jsonl(response: httpx.Response) -> AsyncGenerator[dict, None]:
+    """
+    Split a JSONL byte stream on newlines and parse each line with orjson.
+
+    Works on raw bytes to skip per-chunk text decoding; a trailing line
+    without a newline is parsed once the stream ends.
+    """
+    buffer = bytearray()
+
+    def parse(line: bytes) -> dict | None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            logging.warning(f"[stream_from_ollama] Failed to parse line: {e}")
+            return None
+
+    async for chunk in response.aiter_bytes():
+        buffer += chunk
+        while (nl := buffer.find(b"\n")) != -1:
+            line = bytes(buffer[:nl]).strip()
+            del buffer[: nl + 1]
+            if line and (obj := parse(line)) is not None:
+                yield obj
+    tail = bytes(buffer).strip()
+    if tail and (obj := parse(tail)) is not None:
+        yield obj
+
+
 async def stream_from_ollama(
     prompt: str, model: str = DEFAULT_OLLAMA_MODEL, local: bool = False
 ) -> AsyncGenerator[str, None]:
@@ -129,17 +165,7 @@ async def stream_from_ollama(
                             json=fallback_payload,
                         ) as response2:
                             response2.raise_for_status()
-                            async for line in response2.aiter_lines():
-                                if not line:
-                                    continue
-                                try:
-                                    obj = json.loads(line)
-                                except Exception as e:
-                                    logging.warning(
-                                        f"[stream_from_ollama] Failed to parse line: {e}"
-                                    )
-                                    continue
-
+                            async for obj in _iter_jsonl(response2):
                                 chunk = obj.get("response") or (
                                     obj.get("message", {}) or {}
                                 ).get("content")
@@ -157,17 +183,7 @@ async def stream_from_ollama(
                         return
                     else:
                         raise
-                async for line in response.aiter_lines():
-                    if not line:
-                        continue
-                    try:
-                        obj = json.loads(line)
-                    except Exception as e:
-                        logging.warning(
-                            f"[stream_from_ollama] Failed to parse line: {e}"
-                        )
-                        continue
-
+                async for obj in _iter_jsonl(response):
                     chunk = obj.get("response") or (obj.get("message", {}) or {}).get(
                         "content"
                     )
@@ -204,16 +220,19 @@ class ChatCompletionRequest(BaseModel):
 
 DB_PATH = os.getenv("DB_PATH", "memory.db")
 EMBED_DIM = int(os.getenv("EMBED_DIM", "768"))
-HNSW_MAX_ELEMENTS = 100_000  # adjust as needed
+HNSW_MAX_ELEMENTS = 100_000  # initial capacity; grown on demand
 HNSW_EF_CONSTRUCTION = 200
 HNSW_M = 16
 HNSW_EF = 50
+HNSW_INDEX_PATH = os.getenv("HNSW_INDEX_PATH", "memory_index.bin")
+HNSW_NUM_THREADS = max(1, (os.cpu_count() or 2) // 2)
 
 # -------------------------------
 # FastAPI app
 # -------------------------------
 
-app = FastAPI()
+# orjson serializes the float-heavy payloads (embeddings, point ids) far faster
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # add once, right after app = FastAPI(...)
 from fastapi.middleware.cors import CORSMiddleware
@@ -296,7 +315,6 @@ _cached_embed_model: str | None = None
 async def ollama_embed(text: str) -> list[float]:
     """Use local Ollama for embedding text, trying both /api/embeddings and /api/embed endpoints for each model."""
     global _cached_embed_model
-    import json as _json  # for logging response JSON
 
     candidate_models = EMBED_MODELS
     # If we have a cached model, try it first and only
@@ -352,7 +370,7 @@ async def ollama_embed(text: str) -> list[float]:
                 else:
                     logging.warning(
                         f"[ollama_embed] No embedding in /api/embeddings response for model '{model_name}'. "
-                        f"Response JSON: {_json.dumps(data)[:500]}"
+                        f"Response JSON: {json.dumps(data)[:500]}"
                     )
                 # Now try /api/embed as fallback
                 logging.info(
@@ -396,7 +414,7 @@ async def ollama_embed(text: str) -> list[float]:
                 else:
                     logging.warning(
                         f"[ollama_embed] No embedding in /api/embed response for model '{model_name}'. "
-                        f"Response JSON: {_json.dumps(data2)[:500]}"
+                        f"Response JSON: {json.dumps(data2)[:500]}"
                     )
         except Exception as e:
             last_error = e
@@ -422,9 +440,10 @@ async def ollama_summarize(text: str) -> str:
     """Use local Ollama for summarization."""
     prompt = f"Summarize this text concisely, keeping key details:\n\n{text}"
     logging.info("[ollama_summarize] Using local Ollama for summarization.")
-    output = ""
+    chunks = []
     async for chunk in stream_from_ollama(prompt, model=SUMMARY_MODEL, local=True):
-        output += chunk
+        chunks.append(chunk)
+    output = "".join(chunks)
     logging.info(f"[ollama_summarize] Summary result preview: {output[:120]}...")
     return output.strip()
 
@@ -453,6 +472,8 @@ def _ensure_hnsw_initialized(conn: sqlite3.Connection) -> None:
     """
     Initialize the in‑memory HNSW index and backfill any stored vectors once.
 
+    Loads the persisted index when present and only backfills rows written
+    after it was saved; otherwise rebuilds from every stored vector.
     Keeps RAM hot for fast recall; gracefully skips rows with mismatched dims.
     """
     global _hnsw_index, _hnsw_initialized
@@ -460,36 +481,41 @@ def _ensure_hnsw_initialized(conn: sqlite3.Connection) -> None:
         return
 
     # Try to load persistent HNSW index if available
-    hnsw_path = "memory_index.bin"
-    if os.path.exists(hnsw_path):
+    max_label = 0
+    loaded = False
+    if os.path.exists(HNSW_INDEX_PATH):
         try:
             _hnsw_index = hnswlib.Index(space="cosine", dim=EMBED_DIM)
-            _hnsw_index.load_index(hnsw_path)
-            _hnsw_index.set_ef(HNSW_EF)
-            _hnsw_initialized = True
-            print(f"[HNSW] Loaded persistent vector index from {hnsw_path}.")
-            return
+            _hnsw_index.load_index(HNSW_INDEX_PATH, max_elements=HNSW_MAX_ELEMENTS)
+            max_label = max(_hnsw_index.get_ids_list(), default=0)
+            loaded = True
+            log.info("[HNSW] Loaded persistent vector index from %s.", HNSW_INDEX_PATH)
         except Exception as e:
-            print(
-                f"[HNSW] WARNING: Failed to load persistent index ({e}). Falling back to DB backfill."
+            log.warning(
+                "[HNSW] Failed to load persistent index (%s). Falling back to DB backfill.",
+                e,
             )
 
-    # Init index
-    _hnsw_index = hnswlib.Index(space="cosine", dim=EMBED_DIM)
-    _hnsw_index.init_index(
-        max_elements=HNSW_MAX_ELEMENTS, ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M
-    )
+    if not loaded:
+        _hnsw_index = hnswlib.Index(space="cosine", dim=EMBED_DIM)
+        _hnsw_index.init_index(
+            max_elements=HNSW_MAX_ELEMENTS,
+            ef_construction=HNSW_EF_CONSTRUCTION,
+            M=HNSW_M,
+        )
     _hnsw_index.set_ef(HNSW_EF)
+    _hnsw_index.set_num_threads(HNSW_NUM_THREADS)
 
-    # Backfill existing rows
-    cur = conn.execute("SELECT id, embedding FROM memory_text")
+    # Backfill only the rows the index has not seen yet
+    cur = conn.execute(
+        "SELECT id, embedding FROM memory_text WHERE id > ? AND embedding IS NOT NULL",
+        (max_label,),
+    )
     rows = cur.fetchall()
     if rows:
         ids, vecs = [], []
         for rid, blob in rows:
-            if blob is None:
-                continue
-            vec = np.frombuffer(blob, dtype=np.float32)
+            vec = _decode_embedding(blob)
             if vec.shape[0] != EMBED_DIM:
                 continue
             ids.append(int(rid))
@@ -497,21 +523,74 @@ def _ensure_hnsw_initialized(conn: sqlite3.Connection) -> None:
         if vecs:
             vecs_np = np.stack(vecs, axis=0).astype(np.float32)
             ids_np = np.array(ids, dtype=np.int64)
-            _hnsw_index.add_items(vecs_np, ids_np)
+            _ensure_capacity(len(ids))
+            _hnsw_index.add_items(vecs_np, ids_np, num_threads=HNSW_NUM_THREADS)
     _hnsw_initialized = True
-    print(
-        "[HNSW] In-memory vector index initialized. Loaded:",
-        (_hnsw_index.get_current_count() if _hnsw_index else 0),
+    log.info(
+        "[HNSW] In-memory vector index initialized. Loaded: %d (backfilled %d rows)",
+        _hnsw_index.get_current_count() if _hnsw_index else 0,
+        len(rows),
     )
 
 
+def _ensure_capacity(n: int) -> None:
+    """Grow the HNSW index before adding `n` items rather than failing at the cap."""
+    if _hnsw_index is None:
+        return
+    max_elements = _hnsw_index.get_max_elements()
+    needed = _hnsw_index.get_current_count() + n
+    if needed > max_elements:
+        _hnsw_index.resize_index(max(max_elements * 2, needed))
+        log.info("[HNSW] Resized index capacity to %d", _hnsw_index.get_max_elements())
+
+
 def _normalize(v: np.ndarray) -> np.ndarray:
     n = np.linalg.norm(v)
     return v / (n + 1e-8)
 
 
+def pack_int8(vec: np.ndarray) -> bytes:
+    """Quantize a vector into a `(scale: float32, int8[dim])` BLOB (4 + dim bytes)."""
+    scale = float(np.max(np.abs(vec))) / 127.0 or 1.0
+    q = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+    return np.float32(scale).tobytes() + q.tobytes()
+
+
+def unpack_int8(blob: bytes) -> np.ndarray:
+    """Inverse of `pack_int8`; returns a float32 vector."""
+    scale = np.frombuffer(blob, dtype=np.float32, count=1)[0]
+    return np.frombuffer(blob, dtype=np.int8, offset=4).astype(np.float32) * scale
+
+
+def _decode_embedding(blob: bytes) -> np.ndarray:
+    """Decode a stored embedding, accepting int8 rows and legacy float32 rows."""
+    if len(blob) == 4 + EMBED_DIM:
+        return unpack_int8(blob)
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+def _as_vector(embedding: list[float] | np.ndarray) -> np.ndarray:
+    """
+    Coerce an embedding to a float32 vector and check its dimension.
+
+    ndarrays are passed through without another list -> array conversion.
+    """
+    if isinstance(embedding, np.ndarray):
+        vec = embedding.astype(np.float32, copy=False)
+    elif isinstance(embedding, (list, tuple)):
+        vec = np.asarray(embedding, dtype=np.float32)
+    else:
+        raise ValueError("embedding must be a list of floats")
+    if vec.size != EMBED_DIM:
+        raise ValueError(f"Embedding dim {vec.size} != EMBED_DIM {EMBED_DIM}")
+    return vec
+
+
 def upsert_memory_with_embedding(
-    session_id: str, prompt_text: str, answer_text: str, embedding: list[float]
+    session_id: str,
+    prompt_text: str,
+    answer_text: str,
+    embedding: list[float] | np.ndarray,
 ) -> None:
     """
     Etch a conversation turn into the archive.
@@ -523,16 +602,11 @@ def upsert_memory_with_embedding(
     _ensure_hnsw_initialized(conn)
 
     # Validate embedding
-    if not isinstance(embedding, (list, tuple)):
-        raise ValueError("embedding must be a list of floats")
-    if len(embedding) != EMBED_DIM:
-        raise ValueError(f"Embedding dim {len(embedding)} != EMBED_DIM {EMBED_DIM}")
-
-    vec = np.asarray(embedding, dtype=np.float32)
-    if not np.all(np.isfinite(vec)):
+    vec = _as_vector(embedding)
+    if not np.isfinite(vec).all():
         raise ValueError("Embedding contains non-finite values")
     vec = _normalize(vec)
-    blob = vec.tobytes()
+    blob = pack_int8(vec)
     ts = time.time()
 
     conn.execute(
@@ -545,14 +619,15 @@ def upsert_memory_with_embedding(
     # Add to HNSW (best effort)
     try:
         if _hnsw_index is not None:
+            _ensure_capacity(1)
             _hnsw_index.add_items(vec.reshape(1, -1), np.array([rowid]))
-            print(f"[HNSW] Added vector with rowid {rowid}")
+            log.debug("[HNSW] Added vector with rowid %s", rowid)
     except Exception as e:
-        print(f"[HNSW] WARNING: could not add to HNSW ({e})")
+        log.warning("[HNSW] could not add to HNSW (%s)", e)
 
 
 def query_similar_by_embedding(
-    session_id: str, embedding: list[float], limit: int = 5
+    session_id: str, embedding: list[float] | np.ndarray, limit: int = 5
 ) -> list[tuple[str, str]]:
     """
     Retrieve prior whispers most aligned with the incoming embedding.
@@ -564,11 +639,7 @@ def query_similar_by_embedding(
     _ensure_hnsw_initialized(conn)
 
     # Validate embedding
-    if not isinstance(embedding, (list, tuple)):
-        raise ValueError("embedding must be a list of floats")
-    if len(embedding) != EMBED_DIM:
-        raise ValueError(f"Embedding dim {len(embedding)} != EMBED_DIM {EMBED_DIM}")
-    vec = _normalize(np.asarray(embedding, dtype=np.float32))
+    vec = _normalize(_as_vector(embedding))
 
     # Try HNSW if populated
     if _hnsw_index is not None:
@@ -587,17 +658,19 @@ def query_similar_by_embedding(
                     by_id = {rid: (p, a) for rid, p, a in rows}
                     ordered = [by_id[i] for i in ids if i in by_id]
                     if ordered:
-                        print(
-                            f"[HNSW] Retrieved {len(ordered)} neighbors from HNSW index."
+                        log.debug(
+                            "[HNSW] Retrieved %d neighbors from HNSW index.",
+                            len(ordered),
                         )
                         return ordered[:limit]
             else:
-                print("[HNSW] Index empty; using fallback cosine similarity.")
+                log.debug("[HNSW] Index empty; using fallback cosine similarity.")
         except RuntimeError as e:
-            print(f"[HNSW] Query failed ({e}); falling back to cosine similarity.")
+            log.debug("[HNSW] Query failed (%s); falling back to cosine similarity.", e)
         except Exception as e:
-            print(
-                f"[HNSW] Unexpected query error ({e}); falling back to cosine similarity."
+            log.warning(
+                "[HNSW] Unexpected query error (%s); falling back to cosine similarity.",
+                e,
             )
 
     # Fallback: cosine over session rows
@@ -606,21 +679,19 @@ def query_similar_by_embedding(
         (session_id,),
     ).fetchall()
 
-    def cosine(a: np.ndarray, b: np.ndarray) -> float:
-        return float(
-            np.dot(a, b) / ((np.linalg.norm(a) + 1e-8) * (np.linalg.norm(b) + 1e-8))
-        )
-
-    scored: list[tuple[float, str, str]] = []
-    for p, a, blob in rows:
-        if blob is None:
-            continue
-        v = np.frombuffer(blob, dtype=np.float32)
-        scored.append((cosine(vec, v), p, a))
-
-    scored.sort(reverse=True, key=lambda x: x[0])
-    results = [(p, a) for _, p, a in scored[:limit]]
-    print(f"[DB] Retrieved {len(results)} rows by fallback cosine similarity")
+    decoded = [(p, a, _decode_embedding(b)) for p, a, b in rows if b is not None]
+    decoded = [d for d in decoded if d[2].shape[0] == EMBED_DIM]
+    results: list[tuple[str, str]] = []
+    if decoded and limit > 0:
+        mat = np.stack([v for _, _, v in decoded])
+        norms = (np.linalg.norm(mat, axis=1) + 1e-8) * (np.linalg.norm(vec) + 1e-8)
+        scores = (mat @ vec) / norms
+        # O(N) selection of the top-k, then sort only those k
+        k = min(limit, len(scores))
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        results = [decoded[i][:2] for i in idx]
+    log.debug("[DB] Retrieved %d rows by fallback cosine similarity", len(results))
     return results
 
 
@@ -634,11 +705,34 @@ class ChatEmbeddingRequest(BaseModel):
     text: str | None = None
     prompt_text: str | None = None
     embedding: list[float] | None = None
+    # Base64 of little-endian float32 bytes; ~5x smaller than a JSON float list
+    embedding_b64: str | None = None
     context: str | None = None
 
+    @field_validator("embedding_b64")
+    @classmethod
+    def _check_embedding_b64(cls, value: str | None) -> str | None:
+        """Reject malformed base64 here so the client gets a 422 for this field."""
+        if value is not None:
+            try:
+                raw = base64.b64decode(value, validate=True)
+            except ValueError as e:
+                raise ValueError(f"not valid base64: {e}") from e
+            if len(raw) % 4:
+                raise ValueError(
+                    f"decodes to {len(raw)} bytes, not a whole number of float32s"
+                )
+        return value
+
     def normalized(self):
+        """Return `(session_id, text, embedding, context)`; embedding as float32."""
         text_value = self.text or self.prompt_text or ""
-        embed_value = self.embedding or []
+        if self.embedding_b64:
+            embed_value = np.frombuffer(
+                base64.b64decode(self.embedding_b64), dtype="<f4"
+            ).astype(np.float32, copy=False)
+        else:
+            embed_value = np.asarray(self.embedding or [], dtype=np.float32)
         return self.session_id, text_value, embed_value, self.context
 
 
@@ -665,7 +759,7 @@ class VectorQueryRequest(BaseModel):
 
 
 async def ask_streaming_with_embedding(
-    session_id: str, text: str, embedding: list[float]
+    session_id: str, text: str, embedding: list[float] | np.ndarray
 ) -> AsyncGenerator[str, None]:
     """
     Orchestrate recall + generation.
@@ -698,7 +792,7 @@ async def ask_streaming_with_embedding(
     try:
         upsert_memory_with_embedding(session_id, text, answer_text, embedding)
     except Exception as e:
-        print(f"[DB] WARNING: failed to upsert memory: {e}")
+        log.warning("[DB] failed to upsert memory: %s", e)
 
 
 @app.post("/chat_embedding")
@@ -707,16 +801,17 @@ async def chat_embedding(req: ChatEmbeddingRequest):
     try:
         session_id, text, embedding, context = req.normalized()
     except Exception as e:
-        print(f"[WARN] Could not parse chat_embedding payload: {e}")
-        session_id, text, embedding, context = "unknown", "", [], None
+        log.warning("Could not parse chat_embedding payload: %s", e)
+        session_id, text, context = "unknown", "", None
+        embedding = np.empty(0, dtype=np.float32)
 
     # Auto-generate embedding if missing
-    if not embedding:
+    if not embedding.size:
         logging.info(
             "[chat_embedding] No embedding provided; auto-generating with ollama_embed."
         )
-        embedding = await ollama_embed(text)
-        if not embedding:
+        embedding = np.asarray(await ollama_embed(text), dtype=np.float32)
+        if not embedding.size:
             raise HTTPException(
                 status_code=500, detail="Failed to auto-generate embedding"
             )
@@ -728,14 +823,13 @@ async def chat_embedding(req: ChatEmbeddingRequest):
     # Validate request before streaming
     if not text:
         raise HTTPException(status_code=422, detail="text/prompt_text is required")
-    if not isinstance(embedding, list) or not embedding:
-        raise HTTPException(status_code=422, detail="embedding is required")
-    if len(embedding) != EMBED_DIM:
+    # Validated once here; the ndarray is reused for recall and persistence
+    if embedding.size != EMBED_DIM:
         raise HTTPException(
             status_code=422,
-            detail=f"embedding dim {len(embedding)} != EMBED_DIM {EMBED_DIM}",
+            detail=f"embedding dim {embedding.size} != EMBED_DIM {EMBED_DIM}",
         )
-    if not np.all(np.isfinite(np.asarray(embedding, dtype=np.float32))):
+    if not np.isfinite(embedding).all():
         raise HTTPException(status_code=422, detail="embedding has non-finite values")
 
     async def event_generator():
@@ -820,12 +914,40 @@ async def generate_embedding(text_input: str, model: str = "embeddinggemma"):
         return []
 
 
+async def generate_embeddings(
+    texts: list[str], model: str = "embeddinggemma"
+) -> list[list[float]]:
+    """
+    Embed a batch of strings in one round trip via Ollama /api/embed (list input).
+    Falls back to per-text generate_embedding() calls if the batch request fails
+    or returns the wrong number of vectors.
+    """
+    try:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            resp = await client.post(
+                f"{OLLAMA_URL}/api/embed",
+                json={"model": model, "input": texts},
+            )
+            resp.raise_for_status()
+            embeddings = resp.json().get("embeddings") or []
+        if len(embeddings) == len(texts):
+            return embeddings
+        log.warning(
+            "[generate_embeddings] /api/embed returned %d vectors for %d inputs",
+            len(embeddings),
+            len(texts),
+        )
+    except Exception as e:
+        log.warning("[generate_embeddings] Batch embed failed: %s", e)
+    return [await generate_embedding(t, model=model) for t in texts]
+
+
 @app.post("/v1/embeddings")
 async def v1_embeddings(req: dict):
     """
     OpenAI-compatible embedding endpoint.
     Accepts: {"model": "granite-embedding", "input": "text"} or {"input": ["t1", "t2", ...]}.
-    Ensures generate_embedding() is always called with a single string.
+    All inputs are embedded together in a single batched Ollama request.
     """
     try:
         model = req.get("model", "embeddinggemma")
@@ -860,17 +982,12 @@ async def v1_embeddings(req: dict):
         data = []
         total_tokens = 0
 
-        for i, text_input in enumerate(inputs):
-            if not isinstance(text_input, str):
-                text_input = str(text_input)
-
-            embedding_vector = await generate_embedding(text_input, model=model)
+        vectors = await generate_embeddings(inputs, model=model)
+        for i, (text_input, embedding_vector) in enumerate(zip(inputs, vectors)):
             if not embedding_vector:
                 embedding_vector = [1e-8] * 768  # tiny nonzero fallback
 
             # Sanitize non-finite values (NaN or inf)
-            import math
-
             embedding_vector = [
                 float(x) if isinstance(x, (float, int)) and math.isfinite(x) else 1e-8
                 for x in embedding_vector
@@ -892,11 +1009,13 @@ async def v1_embeddings(req: dict):
             "usage": {"prompt_tokens": total_tokens, "total_tokens": total_tokens},
         }
 
-        print(f"[EMBED] Successfully generated {len(inputs)} embeddings via {model}")
-        return JSONResponse(content=response)
+        log.debug(
+            "[EMBED] Successfully generated %d embeddings via %s", len(inputs), model
+        )
+        return ORJSONResponse(content=response)
 
     except Exception as e:
-        print(f"[ERROR] /v1/embeddings failed: {e}")
+        log.error("/v1/embeddings failed: %s", e)
         return JSONResponse(
             status_code=500,
             content={"error": {"message": str(e), "type": "internal_error"}},
@@ -1033,12 +1152,10 @@ async def v1_chat_completions(req: Request):
         if stream:
 
             async def event_stream():
-                content_so_far = ""
                 try:
                     async for chunk in stream_from_ollama(
                         prompt, model=clean_model, local=not use_remote
                     ):
-                        content_so_far += chunk
                         chunk_obj = {
                             "id": f"chatcmpl-{int(time.time())}",
                             "object": "chat.completion.chunk",
@@ -1072,11 +1189,12 @@ async def v1_chat_completions(req: Request):
 
             return StreamingResponse(event_stream(), media_type="text/event-stream")
         # Non-streaming mode
-        output = ""
+        chunks = []
         async for chunk in stream_from_ollama(
             prompt, model=clean_model, local=not use_remote
         ):
-            output += chunk
+            chunks.append(chunk)
+        output = "".join(chunks)
         # OpenAI-compliant response with finish_reason and usage
         prompt_tokens = len(prompt.split())
         completion_tokens = len(output.split())
@@ -1375,7 +1493,7 @@ async def q_search(
                     (collection_name, idx + offset),
                 ).fetchone()
                 if row and row[0]:
-                    item["vector"] = np.frombuffer(row[0], dtype=np.float32).tolist()
+                    item["vector"] = _decode_embedding(row[0]).tolist()
                 else:
                     item["vector"] = None
 
@@ -1452,12 +1570,13 @@ async def q_get_point(collection_name: str, point_id: str):
     if not row:
         raise HTTPException(status_code=404, detail="point not found")
     embedding_blob, ans = row
-    vec = np.frombuffer(embedding_blob, dtype=np.float32).tolist()
+    vec = _decode_embedding(embedding_blob)
     try:
-        payload = json.loads(ans)
+        payload = orjson.loads(ans)
     except Exception:
         payload = None
-    return {"id": point_id, "vector": vec, "payload": payload}
+    # Returned directly: ORJSONResponse serializes the ndarray without tolist()
+    return ORJSONResponse(content={"id": point_id, "vector": vec, "payload": payload})
 
 
 # ----------------------------------------
@@ -1516,11 +1635,12 @@ async def api_generate(body: dict = Body(...)):
 
         return StreamingResponse(gen_stream(), media_type="application/json")
     else:
-        text = ""
+        chunks = []
         async for chunk in stream_from_ollama(
             prompt, model=clean_model, local=not use_remote
         ):
-            text += chunk
+            chunks.append(chunk)
+        text = "".join(chunks)
         return {
             "model": model,
             "response": text,
@@ -1574,11 +1694,12 @@ async def api_chat(body: dict = Body(...)):
 
         return StreamingResponse(chat_stream(), media_type="application/json")
     else:
-        text = ""
+        chunks = []
         async for chunk in stream_from_ollama(
             prompt, model=clean_model, local=not use_remote
         ):
-            text += chunk
+            chunks.append(chunk)
+        text = "".join(chunks)
         return {
             "model": model,
             "message": {"role": "assistant", "content": text},
@@ -1731,12 +1852,20 @@ async def q_create_index_alias(
 # 2. Flexible upsert points route with logging (PUT/POST)
 @app.api_route("/collections/{collection_name}/points", methods=["PUT", "POST"])
 async def q_upsert_points_debug(collection_name: str, request: Request):
-    """Debugging wrapper for Kilo upsert; logs full body."""
+    """Debugging wrapper for Kilo upsert; logs the full body at DEBUG."""
+    raw = await request.body()
     try:
-        body = await request.json()
-    except Exception:
+        body = orjson.loads(raw)
+    except orjson.JSONDecodeError:
         body = {}
-    logging.info(f"[DEBUG] /points payload for {collection_name}: {body}")
+    # Decoding a large vector payload isn't free, so only do it when it's logged
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug(
+            "[DEBUG] /points payload for %s (%d bytes): %s",
+            collection_name,
+            len(raw),
+            raw.decode(errors="replace"),
+        )
 
     points = (
         body
@@ -1753,7 +1882,7 @@ async def q_upsert_points_debug(collection_name: str, request: Request):
             upsert_memory_with_embedding(
                 session_id=collection_name,
                 prompt_text="",
-                answer_text=json.dumps(qpoint.payload or {}),
+                answer_text=orjson.dumps(qpoint.payload or {}).decode(),
                 embedding=qpoint.vector,
             )
             results_ids.append(qpoint.id)
@@ -1779,19 +1908,16 @@ async def q_delete_points_debug_all(
     collection_name: str, request: Request, wait: bool | None = False
 ):
     """Debug-only delete endpoint: logs everything, always returns OK."""
-    content_type = request.headers.get("content-type", "")
-    qp = dict(request.query_params)
     raw_body = await request.body()
-    logging.info(f"[DEBUG‑FORCE] Delete request for {collection_name}")
-    logging.info(f"  Headers: content-type={content_type}")
-    logging.info(f"  Query params: {qp}")
-    logging.info(f"  Raw body bytes: {raw_body!r}")
-
-    try:
-        body_text = raw_body.decode("utf-8", errors="ignore")
-    except Exception:
-        body_text = str(raw_body)
-    logging.info(f"  Raw body text: {body_text}")
+    logging.info(
+        "[DEBUG‑FORCE] Delete request for %s (%d bytes)", collection_name, len(raw_body)
+    )
+    # Formatting a multi-MB body is only worth it when someone is listening.
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        content_type = request.headers.get("content-type", "")
+        logging.debug("  Headers: content-type=%s", content_type)
+        logging.debug("  Query params: %s", dict(request.query_params))
+        logging.debug("  Raw body text: %s", raw_body.decode("utf-8", errors="ignore"))
 
     return {"status": "ok", "result": {"deleted": 0, "ids": []}}
 
@@ -1800,10 +1926,9 @@ def _close_global_conn():
     global _global_conn, _hnsw_index
     # Save HNSW index before closing DB
     if _hnsw_index is not None:
-        hnsw_path = "memory_index.bin"
         try:
-            _hnsw_index.save_index(hnsw_path)
-            print(f"[HNSW] Saved vector index to {hnsw_path}.")
+            _hnsw_index.save_index(HNSW_INDEX_PATH)
+            print(f"[HNSW] Saved vector index to {HNSW_INDEX_PATH}.")
         except Exception as e:
             print(f"[HNSW] WARNING: Failed to save persistent index ({e}).")
     if _global_conn:
@@ -1898,23 +2023,35 @@ async def retrieve_endpoint(payload: dict = Body(...)):
 
 @app.post("/rag")
 async def rag_endpoint(payload: dict):
-    """RAG endpoint: embed query, recall similar memory, and stream augmented answer."""
+    """
+    RAG endpoint: embed query, recall similar memory, and stream augmented answer.
+    With {"stream": false} the answer is collected and returned alongside the
+    retrieved contexts as {"status": "ok", "contexts": [...], "answer": str},
+    saving callers a separate /retrieve round trip. Callers that already hold
+    the contexts for this question may pass {"contexts": [...]} to skip the
+    embedding + similarity search.
+    """
     session_id = payload.get("session_id", "default_session")
     text = payload.get("text")
     model = payload.get("model", DEFAULT_OLLAMA_MODEL)
+    stream = payload.get("stream", True)
     if not text:
         raise HTTPException(status_code=422, detail="Missing text for RAG")
 
-    # Generate embedding for the query
-    embedding = await ollama_embed(text)
-    if not embedding:
-        raise HTTPException(status_code=500, detail="Failed to generate embedding")
+    contexts = payload.get("contexts")
+    if not (isinstance(contexts, list) and all(isinstance(c, str) for c in contexts)):
+        # Generate embedding for the query
+        embedding = await ollama_embed(text)
+        if not embedding:
+            raise HTTPException(status_code=500, detail="Failed to generate embedding")
+
+        # Retrieve context
+        memories = query_similar_by_embedding(session_id, embedding, limit=5)
+        contexts = [p for p, _ in memories]
 
-    # Retrieve context
-    memories = query_similar_by_embedding(session_id, embedding, limit=5)
     context = ""
-    if memories:
-        snippets = " | ".join(f"{p}" for p, _ in memories[:3])
+    if contexts:
+        snippets = " | ".join(contexts[:3])
         context = f"Context: {snippets}\n\n"
 
     prompt = f"{context}User question: {text}\n\nAnswer:"
@@ -1936,6 +2073,14 @@ async def rag_endpoint(payload: dict):
         except Exception as e:
             yield f"[ERROR] {e}"
 
+    if not stream:
+        chunks = [chunk async for chunk in stream_response()]
+        return {
+            "status": "ok",
+            "contexts": contexts,
+            "answer": "".join(chunks),
+        }
+
     return StreamingResponse(stream_response(), media_type="text/plain")
 
 
@@ -1992,19 +2137,20 @@ async def benchmark_endpoint(payload: dict):
             .removesuffix(":local")
         )
         for text in sum_cases:
-            start = time.time()
+            start_ns = time.perf_counter_ns()
             # If using remote, call stream_from_ollama directly; else ollama_summarize
             if use_remote:
-                summary = ""
+                summary_chunks = []
                 async for chunk in stream_from_ollama(
                     f"Summarize this text concisely, keeping key details:\n\n{text}",
                     model=model,
                     local=False,
                 ):
-                    summary += chunk
+                    summary_chunks.append(chunk)
+                summary = "".join(summary_chunks)
             else:
                 summary = await ollama_summarize(text)
-            latency = time.time() - start
+            latency = (time.perf_counter_ns() - start_ns) / 1e9
             # Compute compression ratio and ghostwire_score
             ratio = len(summary.split()) / len(text.split()) if text.split() else 1.0
             score = ghostwire_score(latency, 1.0 / max(1.0, ratio))
@@ -2038,7 +2184,7 @@ async def benchmark_endpoint(payload: dict):
             .removesuffix(":local")
         )
         for q in rag_cases:
-            start = time.time()
+            start_ns = time.perf_counter_ns()
             # Generate embedding for the query
             embedding = await ollama_embed(q)
             if not embedding:
@@ -2056,7 +2202,7 @@ async def benchmark_endpoint(payload: dict):
             ):
                 resp_chunks.append(chunk)
             answer_text = "".join(resp_chunks)
-            latency = time.time() - start
+            latency = (time.perf_counter_ns() - start_ns) / 1e9
             score = ghostwire_score(latency)
             rag_out.append(
                 {
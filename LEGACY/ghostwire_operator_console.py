@@ -13,9 +13,15 @@ Ritual
 """
 
 import asyncio
+import base64
+import codecs
 import os
+import sys
+import time
 
 import httpx
+import numpy as np
+import orjson
 from ollama import AsyncClient
 
 LOCAL_OLLAMA = os.getenv(
@@ -33,11 +39,29 @@ BENCH_URL = os.getenv("BENCH_URL", f"{CONTROLLER_URL}/benchmark")
 
 DEFAULT_CHAT_MODEL = os.getenv("DEFAULT_CHAT_MODEL", "gemma3:1b")
 
+# Process-local embedding cache: repeated prompts skip the Ollama round trip.
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "1024"))
+_EMBED_CACHE: dict[tuple[str, str], list[float]] = {}
+
+STREAM_FLUSH_INTERVAL = 0.03  # seconds between forced flushes of streamed output
+
+# How long Ollama keeps models resident between console requests
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# One Ollama client for the whole console session; its connection pool is reused
+_OLLAMA = AsyncClient(host=LOCAL_OLLAMA)
+
 
 async def embed_text(text: str):
     """Generate an embedding vector locally using Ollama (embeddinggemma by default)."""
-    client = AsyncClient(host=LOCAL_OLLAMA)
-    resp = await client.embeddings(model=EMBED_MODEL, prompt=text)
+    key = (EMBED_MODEL, text)
+    cached = _EMBED_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    resp = await _OLLAMA.embeddings(
+        model=EMBED_MODEL, prompt=text, keep_alive=OLLAMA_KEEP_ALIVE
+    )
     embedding = resp.get("embedding") or resp.get("embeddings")
     if embedding is None:
         raise RuntimeError("No embedding in response from Ollama")
@@ -49,47 +73,136 @@ async def embed_text(text: str):
         raise RuntimeError(
             f"Unexpected embedding dim {len(embedding)} (expected {EMBED_DIM})"
         )
+
+    if EMBED_CACHE_SIZE > 0:
+        if len(_EMBED_CACHE) >= EMBED_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            _EMBED_CACHE.pop(next(iter(_EMBED_CACHE)))
+        _EMBED_CACHE[key] = embedding
     return embedding
 
 
-async def post_json(url, payload):
-    """Send JSON payload to URL using a shared AsyncClient and print streamed or JSON responses."""
-    import json
+class _StreamWriter:
+    """
+    Buffer streamed text and write it to stdout in bursts.
+    Flushes on newline or once STREAM_FLUSH_INTERVAL has passed, instead of per token.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._last_flush = time.monotonic()
+        # Anything print() queued on the text layer must land before our raw bytes
+        sys.stdout.flush()
+        self._out = getattr(sys.stdout, "buffer", None)
+        # Only needed when stdout has no byte layer; keeps split UTF-8 sequences intact
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def write(self, chunk: str):
+        self.write_bytes(chunk.encode())
+
+    def write_bytes(self, data: bytes):
+        """Append raw UTF-8 bytes straight from the wire, skipping a decode/encode trip."""
+        self._buf += data
+        if b"\n" in data or time.monotonic() - self._last_flush > STREAM_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            if self._out is not None:
+                self._out.write(self._buf)
+            else:
+                sys.stdout.write(self._decoder.decode(bytes(self._buf)))
+            self._buf.clear()
+        sys.stdout.flush()
+        self._last_flush = time.monotonic()
+
 
+def _render_result(data):
+    """Pretty-print a complete JSON result from the controller."""
+    print()
+    if "benchmarks" in data:
+        print("⚙️ Benchmark Results")
+        for task, results in data["benchmarks"].items():
+            print(f"  {task.upper()}:")
+            for r in results:
+                q = r.get("question") or r.get("input", "")
+                score = r.get("ghostwire_score", "N/A")
+                latency = r.get("latency", 0.0)
+                print(f"    • {q[:60]} → {score} score | {latency:.2f}s")
+        if "avg_score" in data:
+            print(f"\n  🧮 Average GhostWire Score: {data['avg_score']}\n")
+    elif "summary" in data:
+        print(f"📝 Summary:\n{data['summary']}")
+    elif "answer" in data:
+        print(f"📚 Answer:\n{data['answer']}")
+    else:
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+
+
+def _event_text(event):
+    """Pull the text delta out of a streamed event (Ollama or OpenAI shape), if any."""
+    if not isinstance(event, dict):
+        return None
+    if isinstance(event.get("response"), str):
+        return event["response"]
+    message = event.get("message")
+    if isinstance(message, dict) and isinstance(message.get("content"), str):
+        return message["content"]
+    choices = event.get("choices")
+    if choices and isinstance(choices[0], dict):
+        delta = choices[0].get("delta") or {}
+        if isinstance(delta.get("content"), str):
+            return delta["content"]
+    return None
+
+
+async def post_json(url, payload):
+    """
+    Send JSON payload to URL and render the reply according to its content type:
+    NDJSON/SSE events and plain text are printed as they arrive, JSON is pretty-printed.
+    """
     async with httpx.AsyncClient(timeout=None) as client:
         try:
-            async with client.stream("POST", url, json=payload) as resp:
+            async with client.stream(
+                "POST",
+                url,
+                content=orjson.dumps(payload),
+                headers={"content-type": "application/json"},
+            ) as resp:
                 resp.raise_for_status()
-                text = await resp.aread()
-                try:
-                    data = json.loads(text)
-                    print()
-                    if "benchmarks" in data:
-                        print("⚙️ Benchmark Results")
-                        for task, results in data["benchmarks"].items():
-                            print(f"  {task.upper()}:")
-                            for r in results:
-                                q = r.get("question") or r.get("input", "")
-                                score = r.get("ghostwire_score", "N/A")
-                                latency = r.get("latency", 0.0)
-                                print(
-                                    f"    • {q[:60]} → {score} score | {latency:.2f}s"
-                                )
-                        if "avg_score" in data:
-                            print(
-                                f"\n  🧮 Average GhostWire Score: {data['avg_score']}\n"
-                            )
-                    elif "summary" in data:
-                        print(f"📝 Summary:\n{data['summary']}")
-                    elif "answer" in data:
-                        print(f"📚 Answer:\n{data['answer']}")
-                    else:
-                        print(json.dumps(data, indent=2))
-                except json.JSONDecodeError:
-                    # fallback to streaming
-                    async for chunk in resp.aiter_text():
-                        print(chunk, end="", flush=True)
-                    print()
+                content_type = resp.headers.get("content-type", "")
+
+                if "ndjson" in content_type or "event-stream" in content_type:
+                    out = _StreamWriter()
+                    async for line in resp.aiter_lines():
+                        if line.startswith("data:"):
+                            line = line[len("data:") :]
+                        line = line.strip()
+                        if not line or line == "[DONE]":
+                            continue
+                        try:
+                            event = orjson.loads(line)
+                        except orjson.JSONDecodeError:
+                            out.write(line + "\n")
+                            continue
+                        text = _event_text(event)
+                        if text is not None:
+                            out.write(text)
+                        else:
+                            out.flush()
+                            _render_result(event)
+                    out.write("\n")
+                elif "json" in content_type:
+                    # No incremental JSON parser in our deps; a result document is
+                    # only renderable once complete anyway.
+                    _render_result(orjson.loads(await resp.aread()))
+                else:
+                    # Take bytes as the transport delivers them; no re-chunking, which
+                    # would hold tokens back until a fixed-size block fills up.
+                    out = _StreamWriter()
+                    async for chunk in resp.aiter_bytes():
+                        out.write_bytes(chunk)
+                    out.write("\n")
         except httpx.HTTPStatusError as e:
             try:
                 content = await e.response.aread()
@@ -104,10 +217,14 @@ async def post_json(url, payload):
 async def run_chat(session_id, text):
     """Run chat embedding command."""
     embedding = await embed_text(text)
+    # Ship the vector as packed float32 rather than a JSON list of floats
+    embedding_b64 = base64.b64encode(
+        np.asarray(embedding, dtype="<f4").tobytes()
+    ).decode()
     payload = {
         "session_id": session_id,
         "prompt_text": text,
-        "embedding": embedding,
+        "embedding_b64": embedding_b64,
     }
     print("🗨️ Chat response:")
     await post_json(f"{CONTROLLER_URL}/chat_embedding", payload)
@@ -146,23 +263,37 @@ async def run_benchmark(session_id, model):
 async def run_direct(text):
     """Send a raw generation request directly to the local Ollama API and stream output."""
     print("💬 Direct Ollama response:")
-    client = AsyncClient(host=LOCAL_OLLAMA)
     try:
-        stream = await client.generate(
+        stream = await _OLLAMA.generate(
             model=DEFAULT_CHAT_MODEL,
             prompt=text,
             stream=True,
+            keep_alive=OLLAMA_KEEP_ALIVE,
         )
+        out = _StreamWriter()
         async for token in stream:
             # Each token is a dict like {'response': 'partial text', 'done': False}
             chunk = token.get("response")
             if chunk:
-                print(chunk, end="", flush=True)
-        print()
+                out.write(chunk)
+        out.write("\n")
     except Exception as e:
         print(f"Error during direct generation: {e}")
 
 
+# Slash command → (handler(session_id, arg), message shown when arg is missing)
+COMMANDS = {
+    "/summarize": (run_summarization, "Please provide text to summarize."),
+    "/rag": (run_rag, "Please provide text for RAG benchmark."),
+    "/bench": (run_benchmark, "Please provide a model name for benchmarking."),
+    "/direct": (
+        lambda _session_id, text: run_direct(text),
+        "Please provide text to send directly to Ollama.",
+    ),
+    "/chat": (run_chat, "Please provide text to chat."),
+}
+
+
 async def repl():
     """Interactive REPL: type commands to commune; Ctrl+C to jack out."""
     session_id = "repl_session"
@@ -188,41 +319,21 @@ async def repl():
             if line.lower() in {"/exit", "exit", "quit"}:
                 print("Exiting REPL.")
                 break
-            if line.startswith("/summarize "):
-                text = line[len("/summarize ") :].strip()
-                if not text:
-                    print("Please provide text to summarize.")
-                    continue
-                await run_summarization(session_id, text)
-            elif line.startswith("/rag "):
-                text = line[len("/rag ") :].strip()
-                if not text:
-                    print("Please provide text for RAG benchmark.")
-                    continue
-                await run_rag(session_id, text)
-            elif line.startswith("/bench "):
-                model = line[len("/bench ") :].strip()
-                if not model:
-                    print("Please provide a model name for benchmarking.")
-                    continue
-                await run_benchmark(session_id, model)
-            elif line.startswith("/direct "):
-                text = line[len("/direct ") :].strip()
-                if not text:
-                    print("Please provide text to send directly to Ollama.")
-                    continue
-                await run_direct(text)
-            elif line.startswith("/chat "):
-                text = line[len("/chat ") :].strip()
-                if not text:
-                    print("Please provide text to chat.")
-                    continue
-                await run_chat(session_id, text)
-            elif line.startswith("/"):
-                print(f"Unknown command: {line}")
-            else:
+            if not line.startswith("/"):
                 # Default to chat embedding for plain text input
                 await run_chat(session_id, line)
+                continue
+            cmd, _, arg = line.partition(" ")
+            command = COMMANDS.get(cmd.lower())
+            if command is None:
+                print(f"Unknown command: {line}")
+                continue
+            handler, missing_arg = command
+            arg = arg.strip()
+            if not arg:
+                print(missing_arg)
+                continue
+            await handler(session_id, arg)
         except (EOFError, KeyboardInterrupt):
             print("\nExiting REPL.")
             break
@@ -26,23 +26,34 @@ Validates:
   2. Cosine similarity consistency of embeddings
 """
 
+import argparse
 import asyncio
+import hashlib
 import time
 
 import httpx
 import numpy as np
+import orjson
 from langchain.schema import Document
-
-try:
-    from langchain_openai import OpenAIEmbeddings
-except ImportError:
-    from langchain_community.embeddings import OpenAIEmbeddings
 import os
 
-from langchain_community.vectorstores import Qdrant
+from qdrant_client import QdrantClient
+from qdrant_client.models import Distance, QueryRequest, VectorParams
 
 CONTROLLER_URL = os.getenv("CONTROLLER_URL", "http://localhost:8000") + "/v1"
 
+# Shared connection pool for all embedding fetches; CONCURRENCY caps requests in flight
+CLIENT_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+CONCURRENCY = int(os.getenv("CONCURRENCY", "8"))
+
+# (model, sha256(text)) → embedding. Opt-in (--cache): with it on, replicates after
+# the first are memory loads, so stability numbers only reflect the first fetch.
+_EMBED_CACHE: dict[tuple[str, bytes], np.ndarray] = {}
+
+# Above this many rounds, all pairs are scored with one GEMM instead of the
+# early-exiting running accumulator (see pairwise_cosine_stats)
+WELFORD_MAX_ROUNDS = 8
+
 DOCS = [
     Document(page_content="Quantum computers exploit superposition and entanglement."),
     Document(page_content="Cats are fluffy, mischievous, and unpredictable animals."),
@@ -63,114 +74,264 @@ QUERIES = [
     "How do computers exploit quantum mechanics?",
 ]
 
+EXTRA_TEXTS = [
+    "Quantum entanglement links particles over distance.",
+    "Fuzzy cats like to sleep on keyboards.",
+    "Neural networks optimize loss functions.",
+]
+
 
 def cosine_similarity(a, b):
-    """Compute cosine similarity between two vectors."""
-    a, b = np.array(a), np.array(b)
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+    """Cosine similarity of two unit-normalized float32 vectors (as fetched)."""
+    return float(a @ b)
+
+
+def pairwise_cosine(runs) -> np.ndarray:
+    """
+    Cosine similarity of every distinct pair of unit vectors in `runs`.
+    Rows are stacked and scored with a single `M @ M.T`; returns the
+    upper-triangular (i < j) entries.
+    """
+    m = np.asarray(runs, dtype=np.float32)
+    return (m @ m.T)[np.triu_indices(len(m), k=1)]
+
+
+def pairwise_cosine_stats(runs, tol: float = 0.0) -> tuple[float, float]:
+    """
+    Mean and population std of pairwise cosine similarity across `runs`.
+    With `tol > 0` and few rounds, pairs feed a running Welford accumulator that
+    stops once the standard error of the mean falls below `tol`; otherwise every
+    pair is scored via pairwise_cosine().
+    """
+    if tol <= 0 or not 2 <= len(runs) <= WELFORD_MAX_ROUNDS:
+        sims = pairwise_cosine(runs)
+        return float(sims.mean()), float(sims.std())
+    n, mean, m2 = 0, 0.0, 0.0
+    for i in range(len(runs)):
+        for j in range(i + 1, len(runs)):
+            x = float(runs[i] @ runs[j])
+            n += 1
+            d = x - mean
+            mean += d / n
+            m2 += d * (x - mean)
+            if n >= 3 and (m2 / (n - 1)) ** 0.5 / n**0.5 < tol:
+                return mean, (m2 / n) ** 0.5
+    return mean, (m2 / n) ** 0.5
+
+
+def pairwise_overlap(ranks: list[list[str]]) -> np.ndarray:
+    """
+    Top-k overlap fraction of every distinct pair of result lists in `ranks`.
+    Contents are mapped to integer ids once and all pairs are compared with one
+    broadcast equality; returns the upper-triangular (i < j) entries.
+    """
+    id_of = {content: i for i, content in enumerate({c for r in ranks for c in r})}
+    ids = np.array([[id_of[c] for c in r] for r in ranks], dtype=np.int32)
+    hits = (ids[:, None, :, None] == ids[None, :, None, :]).any(-1).sum(-1)
+    return (hits / ids.shape[1])[np.triu_indices(len(ids), k=1)]
 
 
-async def fetch_embedding(text: str):
+async def fetch_embedding(text: str, client: httpx.AsyncClient | None = None):
     """Query the controller directly for an embedding vector."""
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        payload = {"model": MODEL_NAME, "input": text}
-        start = time.perf_counter()
-        resp = await client.post(f"{CONTROLLER_URL}/embeddings", json=payload)
-        latency = time.perf_counter() - start
-        data = resp.json()
-        embedding = data.get("data", [{}])[0].get("embedding", [])
-        return np.array(embedding), latency
+    # Callers issuing many requests should pass a shared client to reuse connections
+    if client is None:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            return await fetch_embedding(text, client)
+    payload = {"model": MODEL_NAME, "input": text}
+    start = time.perf_counter()
+    resp = await client.post(
+        f"{CONTROLLER_URL}/embeddings",
+        content=orjson.dumps(payload),
+        headers={"content-type": "application/json"},
+    )
+    latency = time.perf_counter() - start
+    data = orjson.loads(resp.content)
+    embedding = np.asarray(
+        data.get("data", [{}])[0].get("embedding", []), dtype=np.float32
+    )
+    embedding /= np.linalg.norm(embedding) + 1e-12
+    return embedding, latency
 
 
-async def run_retrieval_test(rounds: int = 5):
+async def fetch_embeddings_batch(
+    texts: list[str], client: httpx.AsyncClient, use_cache: bool = False
+) -> tuple[list[np.ndarray], float]:
+    """
+    Embed many strings in one OpenAI-style request (`input` as a list).
+    Vectors come back as unit-normalized float32 rows.
+    """
+    if use_cache:
+        keys = [(MODEL_NAME, hashlib.sha256(t.encode()).digest()) for t in texts]
+        # Only unseen strings go over the wire, each once
+        missing = dict.fromkeys(
+            (t, k) for t, k in zip(texts, keys) if k not in _EMBED_CACHE
+        )
+        latency = 0.0
+        if missing:
+            vectors, latency = await fetch_embeddings_batch(
+                [t for t, _ in missing], client
+            )
+            _EMBED_CACHE.update(zip((k for _, k in missing), vectors))
+        return [_EMBED_CACHE[k] for k in keys], latency
+    payload = {"model": MODEL_NAME, "input": texts}
+    start = time.perf_counter()
+    resp = await client.post(
+        f"{CONTROLLER_URL}/embeddings",
+        content=orjson.dumps(payload),
+        headers={"content-type": "application/json"},
+    )
+    latency = time.perf_counter() - start
+    resp.raise_for_status()
+    data = sorted(orjson.loads(resp.content).get("data", []), key=lambda d: d["index"])
+    vectors = np.asarray([d["embedding"] for d in data], dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+    return list(vectors), latency
+
+
+async def fetch_runs(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    texts: list[str],
+    rounds: int,
+    use_cache: bool = False,
+) -> np.ndarray:
+    """
+    Embed each of `texts` `rounds` times in a single batched request (bounded by
+    `sem`). Returns one contiguous float32 array of shape (len(texts), rounds,
+    dim), so `runs[i]` is the (rounds, dim) replicate matrix for text i.
+    """
+    async with sem:
+        vectors, _ = await fetch_embeddings_batch(
+            [text for text in texts for _ in range(rounds)], client, use_cache
+        )
+    dim = len(vectors[0])
+    runs = np.empty((len(texts), rounds, dim), dtype=np.float32)
+    for row, vector in zip(runs.reshape(-1, dim), vectors):
+        row[:] = vector
+    return runs
+
+
+async def run_retrieval_test(
+    rounds: int = 5,
+    use_cache: bool = False,
+    tol: float = 0.0,
+    client: httpx.AsyncClient | None = None,
+):
+    if client is None:
+        async with httpx.AsyncClient(timeout=30.0, limits=CLIENT_LIMITS) as client:
+            return await run_retrieval_test(rounds, use_cache, tol, client)
     print(
         f"🔍 Running retrieval & embedding stability test via Ghostwire controller at {CONTROLLER_URL}"
     )
     print("=" * 80)
 
-    for model in MODELS:
-        global MODEL_NAME
-        MODEL_NAME = model
-        print(f"\n🚀 Testing model: {model}")
-        print("-" * 80)
-
-        embedding = OpenAIEmbeddings(
-            openai_api_base=CONTROLLER_URL,
-            openai_api_key="ghostwire",
-            model=MODEL_NAME,
-        )
+    sem = asyncio.Semaphore(CONCURRENCY)
+    qdrant = QdrantClient(location=":memory:")
+    doc_texts = [doc.page_content for doc in DOCS]
+    try:
+        for model in MODELS:
+            global MODEL_NAME
+            MODEL_NAME = model
+            print(f"\n🚀 Testing model: {model}")
+            print("-" * 80)
+
+            # Corpus in one batch; replicate query/extra embeddings one batch each
+            (doc_vectors, _), query_runs, extra_runs = await asyncio.gather(
+                fetch_embeddings_batch(doc_texts, client, use_cache),
+                fetch_runs(client, sem, QUERIES, rounds, use_cache),
+                fetch_runs(client, sem, EXTRA_TEXTS, rounds, use_cache),
+            )
 
-        store = Qdrant.from_documents(
-            DOCS,
-            embedding=embedding,
-            location=":memory:",
-            collection_name=f"ghostwire-retrieval-test-{model}",
-        )
+            # Index the precomputed vectors directly; no per-document re-embedding
+            collection = f"ghostwire-retrieval-test-{model}"
+            qdrant.create_collection(
+                collection,
+                vectors_config=VectorParams(
+                    size=len(doc_vectors[0]), distance=Distance.COSINE
+                ),
+            )
+            qdrant.upload_collection(
+                collection,
+                vectors=np.stack(doc_vectors),
+                payload=[{"page_content": text} for text in doc_texts],
+                ids=list(range(len(doc_texts))),
+            )
 
-        # --- Retrieval Consistency ---
-        for query in QUERIES:
-            ranks = []
-            for _ in range(rounds):
-                results = store.similarity_search(query, k=3)
-                ranks.append([doc.page_content for doc in results])
-
-            consistency = np.mean(
-                [
-                    len(set(ranks[i]) & set(ranks[j])) / len(ranks[i])
-                    for i in range(rounds)
-                    for j in range(i + 1, rounds)
+            # --- Retrieval Consistency ---
+            # Each round searches with its own replicate query embedding; every
+            # (query, round) lookup goes to Qdrant in one batch
+            responses = qdrant.query_batch_points(
+                collection,
+                requests=[
+                    QueryRequest(query=vector.tolist(), limit=3, with_payload=True)
+                    for runs in query_runs
+                    for vector in runs
+                ],
+            )
+            for q, (query, runs) in enumerate(zip(QUERIES, query_runs)):
+                ranks = [
+                    [hit.payload["page_content"] for hit in response.points]
+                    for response in responses[q * rounds : (q + 1) * rounds]
                 ]
+
+                consistency = pairwise_overlap(ranks).mean()
+
+                print(f"🧠 Query: {query}")
+                print(
+                    f"   Retrieval stability (top-3 overlap): {consistency * 100:.2f}%"
+                )
+
+                # --- Embedding Stability for this query ---
+                avg_sim, std_sim = pairwise_cosine_stats(runs, tol)
+                print(f"     Avg cosine similarity: {avg_sim:.6f} ± {std_sim:.6f}")
+
+                # --- Ghostwire score (latency is placeholder 1.0) ---
+                ghostwire_score = compute_ghostwire_score(
+                    consistency, avg_sim, latency=1.0
+                )
+                print(f"     Ghostwire score: {ghostwire_score:.4f}")
+
+            print("-" * 80)
+            # --- Embedding Stability (extra test texts) ---
+            print(
+                "🧬 Measuring raw embedding cosine similarity across runs (extra texts):"
             )
+            for text, runs in zip(EXTRA_TEXTS, extra_runs):
+                avg_sim, std_sim = pairwise_cosine_stats(runs, tol)
+                print(f"   Text: {text[:40]!r}...")
+                print(f"     Avg cosine similarity: {avg_sim:.6f} ± {std_sim:.6f}")
+
+            print("=" * 80)
+    finally:
+        qdrant.close()
 
-            print(f"🧠 Query: {query}")
-            print(f"   Retrieval stability (top-3 overlap): {consistency * 100:.2f}%")
-
-            # --- Embedding Stability for this query ---
-            runs = []
-            for _ in range(rounds):
-                vec, _ = await fetch_embedding(query)
-                runs.append(vec)
-            sims = [
-                cosine_similarity(runs[i], runs[j])
-                for i in range(rounds)
-                for j in range(i + 1, rounds)
-            ]
-            avg_sim = np.mean(sims)
-            std_sim = np.std(sims)
-            print(f"     Avg cosine similarity: {avg_sim:.6f} ± {std_sim:.6f}")
-
-            # --- Ghostwire score (latency is placeholder 1.0) ---
-            ghostwire_score = compute_ghostwire_score(consistency, avg_sim, latency=1.0)
-            print(f"     Ghostwire score: {ghostwire_score:.4f}")
-
-        print("-" * 80)
-        # --- Embedding Stability (extra test texts) ---
-        print("🧬 Measuring raw embedding cosine similarity across runs (extra texts):")
-        for text in [
-            "Quantum entanglement links particles over distance.",
-            "Fuzzy cats like to sleep on keyboards.",
-            "Neural networks optimize loss functions.",
-        ]:
-            runs = []
-            for _ in range(rounds):
-                vec, _ = await fetch_embedding(text)
-                runs.append(vec)
-            sims = [
-                cosine_similarity(runs[i], runs[j])
-                for i in range(rounds)
-                for j in range(i + 1, rounds)
-            ]
-            avg_sim = np.mean(sims)
-            std_sim = np.std(sims)
-            print(f"   Text: {text[:40]!r}...")
-            print(f"     Avg cosine similarity: {avg_sim:.6f} ± {std_sim:.6f}")
-
-        print("=" * 80)
     print("✅ Retrieval and embedding stability test complete.")
     return True
 
 
+async def main(rounds: int = 5, use_cache: bool = False, tol: float = 0.0):
+    """Run the test on one client whose connection pool spans the whole run."""
+    async with httpx.AsyncClient(timeout=30.0, limits=CLIENT_LIMITS) as client:
+        return await run_retrieval_test(rounds, use_cache, tol, client)
+
+
 if __name__ == "__main__":
-    import asyncio
+    parser = argparse.ArgumentParser(
+        description="Retrieval consistency and embedding stability test"
+    )
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse embeddings per (model, text) instead of re-fetching replicates",
+    )
+    parser.add_argument(
+        "--tol",
+        type=float,
+        default=0.0,
+        help="stop scoring cosine pairs once the mean's standard error is below this"
+        f" (only for rounds <= {WELFORD_MAX_ROUNDS}; 0 scores every pair)",
+    )
+    args = parser.parse_args()
 
-    asyncio.run(run_retrieval_test(rounds=5))
+    asyncio.run(main(rounds=args.rounds, use_cache=args.cache, tol=args.tol))
@@ -1,7 +1,10 @@
 # ghostwire_summarization_benchmark.py
 
 import asyncio
+import csv
+import operator
 import os
+import re
 import time
 
 import httpx
@@ -12,11 +15,16 @@ CONTROLLER_URL = os.getenv("CONTROLLER_URL", "http://localhost:8000")
 CHAT_ROUTE = (
     "/chat_completion"  # or "/chat_embedding" if that’s what your summarizer uses
 )
+CONCURRENCY = int(os.getenv("CONCURRENCY", "4"))  # summaries in flight at once
+EMBED_ROUTE = "/v1/embeddings"
+EMBED_MODEL = os.getenv("EMBED_MODEL", "embeddinggemma")
 MODELS = [
     "gemma3:1b",
     "gemma3n:e2b",
     "gemma3n:e4b",
 ]
+# One pooled client is shared by every summarize/embed call
+CLIENT_LIMITS = httpx.Limits(max_connections=len(MODELS) * 4)
 
 DOCUMENTS = [
     {
@@ -40,45 +48,16 @@ DOCUMENTS = [
     },
 ]
 
+# Gold summaries are scored against every model, so tokenize them once.
+for _doc in DOCUMENTS:
+    _doc["_gold_words"] = frozenset(_doc["gold_summary"].lower().split())
 
-async def summarize(text: str, model: str):
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        if CHAT_ROUTE == "/chat_completion":
-            payload = {"text": text, "model": model, "stream": False}
-        else:
-            payload = {
-                "model": model,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a concise scientific summarizer.",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Summarize this text in 2-3 sentences:\n\n{text}",
-                    },
-                ],
-            }
-        start = time.perf_counter()
-        resp = await client.post(f"{CONTROLLER_URL}{CHAT_ROUTE}", json=payload)
-        resp.raise_for_status()
-        latency = time.perf_counter() - start
-        data = resp.json()
-        if isinstance(data, dict):
-            # Handle local controller response {"summary": "..."} or OpenAI-like schema
-            if "summary" in data:
-                content = data["summary"]
-            elif "message" in data and isinstance(data["message"], dict):
-                content = data["message"].get("content", "")
-            elif "choices" in data and data["choices"]:
-                content = data["choices"][0].get("message", {}).get("content", "")
-            else:
-                content = str(data)
-        else:
-            content = str(data)
-        # Cleanup: strip conversational phrases and artifacts
-        if isinstance(content, str):
-            cleanup_phrases = [
+# Summary cleanup patterns, compiled once rather than per response.
+_CLEANUP_PHRASES = re.compile(
+    "|".join(
+        map(
+            re.escape,
+            (
                 "Okay, here's a concise and clear summary of the text:",
                 "Okay, here’s a concise and clear summary of the text:",
                 "Do you want me to elaborate",
@@ -88,38 +67,72 @@ async def summarize(text: str, model: str):
                 "—",
                 "---",
                 "**In short:**",
-            ]
-            for phrase in cleanup_phrases:
-                content = content.replace(phrase, "")
-            # Remove trailing conversational follow-ups
-            import re
-
-            content = re.sub(
-                r"(Would you like me.*|Do you want me.*|on any specific aspect.*|perhaps adjust.*|for example.*)$",
-                "",
-                content,
-                flags=re.IGNORECASE,
-            )
-
-            # Truncate at any trailing quote followed by conversational prompt
-            content = re.split(
-                r'["”]\s*(on any specific aspect|Would you like me|Do you want me|perhaps adjust|for example)',
-                content,
-                maxsplit=1,
-                flags=re.IGNORECASE,
-            )[0]
-
-            # Remove duplicated sentences
-            sentences = content.split(". ")
-            deduped = []
-            for s in sentences:
-                if s.strip() and s.strip() not in deduped:
-                    deduped.append(s.strip())
-            content = ". ".join(deduped)
-
-            # Remove excessive whitespace and markdown
-            content = content.replace("\n", " ").replace("  ", " ").strip()
-        return content, latency
+            ),
+        )
+    )
+)
+_TRAILING = re.compile(
+    r"(Would you like me.*|Do you want me.*|on any specific aspect.*|perhaps adjust.*|for example.*)$",
+    re.IGNORECASE,
+)
+_TRUNCATE = re.compile(
+    r'["”]\s*(?:on any specific aspect|Would you like me|Do you want me|perhaps adjust|for example)',
+    re.IGNORECASE,
+)
+
+
+async def summarize(text: str, model: str, client: httpx.AsyncClient | None = None):
+    if client is None:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            return await summarize(text, model, client)
+    if CHAT_ROUTE == "/chat_completion":
+        payload = {"text": text, "model": model, "stream": False}
+    else:
+        payload = {
+            "model": model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a concise scientific summarizer.",
+                },
+                {
+                    "role": "user",
+                    "content": f"Summarize this text in 2-3 sentences:\n\n{text}",
+                },
+            ],
+        }
+    start = time.perf_counter()
+    resp = await client.post(f"{CONTROLLER_URL}{CHAT_ROUTE}", json=payload)
+    resp.raise_for_status()
+    latency = time.perf_counter() - start
+    data = resp.json()
+    if isinstance(data, dict):
+        # Handle local controller response {"summary": "..."} or OpenAI-like schema
+        if "summary" in data:
+            content = data["summary"]
+        elif "message" in data and isinstance(data["message"], dict):
+            content = data["message"].get("content", "")
+        elif "choices" in data and data["choices"]:
+            content = data["choices"][0].get("message", {}).get("content", "")
+        else:
+            content = str(data)
+    else:
+        content = str(data)
+    # Cleanup: strip conversational phrases and artifacts
+    if isinstance(content, str):
+        content = _CLEANUP_PHRASES.sub("", content)
+        # Remove trailing conversational follow-ups
+        content = _TRAILING.sub("", content)
+        # Truncate at any trailing quote followed by conversational prompt
+        content = _TRUNCATE.split(content, maxsplit=1)[0]
+
+        # Remove duplicated sentences (dict keeps first-seen order)
+        stripped = (s.strip() for s in content.split(". "))
+        content = ". ".join(dict.fromkeys(s for s in stripped if s))
+
+        # Remove excessive whitespace and markdown
+        content = content.replace("\n", " ").replace("  ", " ").strip()
+    return content, latency
 
 
 def compute_token_ratio(summary: str, reference: str):
@@ -139,17 +152,36 @@ def compute_length_penalty(summary: str, reference: str):
     return 1.0 if ratio > 1.0 else np.exp(1 - 1 / ratio)
 
 
-def compute_cosine_similarity(text1: str, text2: str):
-    # Placeholder: returns a random float between 0 and 1
-    # In a real implementation, embed texts and compute cosine similarity
-    return np.random.uniform(0, 1)
+async def embed_normalized(
+    *texts: str, client: httpx.AsyncClient | None = None
+) -> list[np.ndarray]:
+    """
+    Embed texts in one controller call and L2-normalize each vector once, so
+    cosine similarity downstream is a plain float32 dot product.
+    """
+    if client is None:
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            return await embed_normalized(*texts, client=client)
+    resp = await client.post(
+        f"{CONTROLLER_URL}{EMBED_ROUTE}",
+        json={"model": EMBED_MODEL, "input": list(texts)},
+    )
+    resp.raise_for_status()
+    data = sorted(resp.json()["data"], key=lambda d: d["index"])
+    vecs = np.asarray([d["embedding"] for d in data], dtype=np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12
+    return list(vecs)
+
 
+def compute_cosine_similarity(vec1: np.ndarray, vec2: np.ndarray):
+    # Vectors come unit-norm from embed_normalized, so cosine is just the dot product
+    return float(np.dot(vec1, vec2))
 
-def simple_hallucination_check(summary: str, reference: str):
+
+def simple_hallucination_check(summary: str, ref_words: frozenset[str]):
     # Simple heuristic: check if summary contains words not in reference
-    ref_words = set(reference.lower().split())
     summary_words = set(summary.lower().split())
-    hallucinated_words = summary_words - ref_words
+    hallucinated_words = summary_words.difference(ref_words)
     # Return proportion of hallucinated words
     if len(summary_words) == 0:
         return 0.0
@@ -166,77 +198,138 @@ def compute_ghostwire_score(quality, hallucination, length_penalty, latency):
     return score
 
 
-async def run_summarization_benchmark():
+def _score(
+    scorer: rouge_scorer.RougeScorer,
+    summary: str,
+    gold_summary: str,
+    gold_words: frozenset[str],
+    summary_vec: np.ndarray,
+    gold_vec: np.ndarray,
+) -> dict:
+    """CPU-bound metric block for one summary; runs in a worker thread."""
+    rouge_scores = scorer.score(gold_summary, summary)
+    token_ratio = compute_token_ratio(summary, gold_summary)
+    length_penalty = compute_length_penalty(summary, gold_summary)
+    cosine_sim = compute_cosine_similarity(summary_vec, gold_vec)
+    hallucination_score = simple_hallucination_check(summary, gold_words)
+    quality_score = (
+        0.4 * rouge_scores["rouge1"].fmeasure
+        + 0.2 * rouge_scores["rouge2"].fmeasure
+        + 0.2 * rouge_scores["rougeL"].fmeasure
+        + 0.1 * cosine_sim
+        - 0.1 * hallucination_score
+    ) * length_penalty
+
+    return {
+        "rouge1_f": rouge_scores["rouge1"].fmeasure,
+        "rouge2_f": rouge_scores["rouge2"].fmeasure,
+        "rougeL_f": rouge_scores["rougeL"].fmeasure,
+        "token_ratio": token_ratio,
+        "length_penalty": length_penalty,
+        "cosine_similarity": cosine_sim,
+        "hallucination_score": hallucination_score,
+        "quality_score": quality_score,
+    }
+
+
+async def evaluate_summary(
+    client: httpx.AsyncClient,
+    sem: asyncio.Semaphore,
+    scorer: rouge_scorer.RougeScorer,
+    model: str,
+    doc: dict,
+) -> dict:
+    """Summarize one document with one model and compute its quality metrics."""
+    gold_summary = doc["gold_summary"]
+    async with sem:
+        summary, latency = await summarize(doc["text"], model, client)
+        summary_vec, gold_vec = await embed_normalized(
+            summary, gold_summary, client=client
+        )
+    # Score off the event loop, after releasing the semaphore, so tokenization
+    # overlaps with the next summarize round-trip.
+    metrics = await asyncio.to_thread(
+        _score,
+        scorer,
+        summary,
+        gold_summary,
+        doc["_gold_words"],
+        summary_vec,
+        gold_vec,
+    )
+    return {
+        "model": model,
+        "label": doc["label"],
+        "latency": latency,
+        "summary": summary,
+        **metrics,
+    }
+
+
+async def run_summarization_benchmark(client: httpx.AsyncClient | None = None):
+    if client is None:
+        async with httpx.AsyncClient(timeout=60.0, limits=CLIENT_LIMITS) as client:
+            return await run_summarization_benchmark(client)
     print("🧩 Running summarization benchmark via Ghostwire controller")
     print("=" * 80)
-    results = []
 
     scorer = rouge_scorer.RougeScorer(["rouge1", "rouge2", "rougeL"], use_stemmer=True)
+    sem = asyncio.Semaphore(CONCURRENCY)
+    cases = [(model, doc) for model in MODELS for doc in DOCUMENTS]
 
-    for model in MODELS:
-        print(f"\n🚀 Testing summarization model: {model}")
-        for doc in DOCUMENTS:
-            label = doc["label"]
-            text = doc["text"]
-            gold_summary = doc["gold_summary"]
-            try:
-                summary, latency = await summarize(text, model)
-                rouge_scores = scorer.score(gold_summary, summary)
-                token_ratio = compute_token_ratio(summary, gold_summary)
-                length_penalty = compute_length_penalty(summary, gold_summary)
-                cosine_sim = compute_cosine_similarity(summary, gold_summary)
-                hallucination_score = simple_hallucination_check(summary, gold_summary)
-                quality_score = (
-                    0.4 * rouge_scores["rouge1"].fmeasure
-                    + 0.2 * rouge_scores["rouge2"].fmeasure
-                    + 0.2 * rouge_scores["rougeL"].fmeasure
-                    + 0.1 * cosine_sim
-                    - 0.1 * hallucination_score
-                ) * length_penalty
-
-                ghostwire_score = compute_ghostwire_score(
-                    quality_score, hallucination_score, length_penalty, latency
-                )
+    # Every (model, document) pair is independent: keep CONCURRENCY requests in
+    # flight on the pooled client, then report in the original order.
+    outcomes = await asyncio.gather(
+        *(evaluate_summary(client, sem, scorer, model, doc) for model, doc in cases),
+        return_exceptions=True,
+    )
 
-                results.append(
-                    {
-                        "model": model,
-                        "label": label,
-                        "latency": latency,
-                        "summary": summary,
-                        "rouge1_f": rouge_scores["rouge1"].fmeasure,
-                        "rouge2_f": rouge_scores["rouge2"].fmeasure,
-                        "rougeL_f": rouge_scores["rougeL"].fmeasure,
-                        "token_ratio": token_ratio,
-                        "length_penalty": length_penalty,
-                        "cosine_similarity": cosine_sim,
-                        "hallucination_score": hallucination_score,
-                        "quality_score": quality_score,
-                        "ghostwire_score": ghostwire_score,
-                    }
-                )
-                print(f"\n📄 [{model}] {label} summary ({latency:.2f}s):\n{summary}")
-                print(f"ROUGE-1 F1: {rouge_scores['rouge1'].fmeasure:.4f}")
-                print(f"ROUGE-2 F1: {rouge_scores['rouge2'].fmeasure:.4f}")
-                print(f"ROUGE-L F1: {rouge_scores['rougeL'].fmeasure:.4f}")
-                print(f"Token count ratio (summary/gold): {token_ratio:.4f}")
-                print(f"Length penalty (brevity penalty): {length_penalty:.4f}")
-                print(f"Cosine similarity (placeholder): {cosine_sim:.4f}")
-                print(
-                    f"Hallucination score (proportion of hallucinated words): {hallucination_score:.4f}"
+    # Composite score for all successful rows in one vectorized pass
+    results = [row for row in outcomes if not isinstance(row, Exception)]
+    if results:
+        columns = np.array(
+            [
+                (
+                    row["quality_score"],
+                    row["hallucination_score"],
+                    row["length_penalty"],
+                    row["latency"],
                 )
-                print(f"Composite quality score: {quality_score:.4f}")
-                print(f"Ghostwire score: {ghostwire_score:.4f}")
-                print("-" * 60)
-            except Exception as e:
-                print(f"⚠️ Error summarizing {label}: {e}")
+                for row in results
+            ]
+        ).T
+        for row, score in zip(results, compute_ghostwire_score(*columns).tolist()):
+            row["ghostwire_score"] = score
+
+    current_model = None
+    for (model, doc), row in zip(cases, outcomes):
+        if model != current_model:
+            current_model = model
+            print(f"\n🚀 Testing summarization model: {model}")
+        label = doc["label"]
+        if isinstance(row, Exception):
+            print(f"⚠️ Error summarizing {label}: {row}")
+            continue
+        print(
+            f"\n📄 [{model}] {label} summary ({row['latency']:.2f}s):\n{row['summary']}"
+        )
+        print(f"ROUGE-1 F1: {row['rouge1_f']:.4f}")
+        print(f"ROUGE-2 F1: {row['rouge2_f']:.4f}")
+        print(f"ROUGE-L F1: {row['rougeL_f']:.4f}")
+        print(f"Token count ratio (summary/gold): {row['token_ratio']:.4f}")
+        print(f"Length penalty (brevity penalty): {row['length_penalty']:.4f}")
+        print(f"Cosine similarity (embeddings): {row['cosine_similarity']:.4f}")
+        print(
+            f"Hallucination score (proportion of hallucinated words): {row['hallucination_score']:.4f}"
+        )
+        print(f"Composite quality score: {row['quality_score']:.4f}")
+        print(f"Ghostwire score: {row['ghostwire_score']:.4f}")
+        print("-" * 60)
 
     print("=" * 80)
     print("✅ Summarization benchmark complete.")
 
     # Save results to CSV
-    import csv
-
     csv_filename = "summarization_benchmark_results.csv"
     csv_headers = [
         "model",
@@ -253,13 +346,20 @@ async def run_summarization_benchmark():
         "ghostwire_score",
     ]
     with open(csv_filename, mode="w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=csv_headers)
-        writer.writeheader()
-        for row in results:
-            writer.writerow({k: row.get(k, "") for k in csv_headers})
+        # Every result row carries all headers, so emit plain tuples.
+        get_fields = operator.itemgetter(*csv_headers)
+        writer = csv.writer(csvfile)
+        writer.writerow(csv_headers)
+        writer.writerows(map(get_fields, results))
     print("📊 Results saved to summarization_benchmark_results.csv")
     return results
 
 
+async def main():
+    """Run the benchmark on one client whose connection pool spans the whole run."""
+    async with httpx.AsyncClient(timeout=60.0, limits=CLIENT_LIMITS) as client:
+        return await run_summarization_benchmark(client)
+
+
 if __name__ == "__main__":
-    asyncio.run(run_summarization_benchmark())
+    asyncio.run(main())
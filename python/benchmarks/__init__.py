@@ -1,11 +1,6 @@
 """GhostWire benchmarking package"""
 
-from . import (
-    embedding_benchmarks,
-    model_comparison_benchmark,
-    rag_benchmarks,
-    summarization_benchmarks,
-)
+import importlib
 
 __all__ = [
     "embedding_benchmarks",
@@ -13,3 +8,11 @@ __all__ = [
     "summarization_benchmarks",
     "model_comparison_benchmark",
 ]
+
+
+def __getattr__(name: str):
+    # Benchmarks are imported on first use, so a script importing the shared
+    # helpers in .common doesn't load (or re-import) every other benchmark
+    if name in __all__:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,43 @@
+"""
+Pieces shared by the GhostWire Refractory benchmark scripts
+
+Only lightweight imports here, so a benchmark's `--help` stays fast.
+"""
+
+import asyncio
+import sys
+from collections.abc import Coroutine
+
+import httpx
+
+# One keep-alive pool per benchmark instance, reused across every iteration
+CLIENT_LIMITS = httpx.Limits(
+    max_keepalive_connections=64, max_connections=128, keepalive_expiry=30.0
+)
+
+
+class BufferedReport:
+    """Report lines are buffered and written once, outside the timed tests"""
+
+    def __init__(self):
+        self._log: list[str] = []
+
+    def _report(self, line: str = ""):
+        """Queue a report line; written out by _flush_report"""
+        self._log.append(line)
+
+    def _flush_report(self):
+        """Write queued report lines to stdout in one call"""
+        if self._log:
+            sys.stdout.write("\n".join(self._log) + "\n")
+            sys.stdout.flush()
+            self._log.clear()
+
+
+def run(main: Coroutine) -> None:
+    """Run a benchmark's main() on uvloop when it is installed"""
+    try:
+        import uvloop  # Optional: a faster event loop
+    except ImportError:
+        uvloop = None
+    asyncio.run(main, loop_factory=uvloop.new_event_loop if uvloop else None)
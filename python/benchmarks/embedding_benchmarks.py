@@ -4,172 +4,326 @@ Updated benchmarking tools for GhostWire Refractory with GHOSTWIRE scoring
 
 import argparse
 import asyncio
+import importlib
+import importlib.util
 import os
 import sys
 import time
 
 import httpx
-import numpy as np
-import psutil
+import orjson
 
 # Add the python directory to the path to access ghostwire modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
-from ghostwire.config.settings import settings
-from ghostwire.utils.ghostwire_scoring import (
-    compute_general_ghostwire_score,
-    format_benchmark_results_with_scores,
-)
+from benchmarks.common import CLIENT_LIMITS, BufferedReport, run
 
+# numpy, psutil and the ghostwire package are imported where they are used,
+# so `--help` and argument errors return without paying for them
 
-class BenchmarkRunner:
+JSON_HEADERS = {"content-type": "application/json"}
+
+
+def accept_encoding(compression: str) -> str:
+    """
+    Accept-Encoding header for a --compression mode.
+    "off" asks for identity bodies (no decode work on localhost), "zstd" asks
+    for zstd only, and "auto" offers every codec httpx can decode here.
+    """
+    if compression == "off":
+        return "identity"
+    if compression == "zstd":
+        return "zstd"
+    codecs = ["gzip", "deflate"]
+    if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+        codecs.append("br")
+    if importlib.util.find_spec("zstandard"):
+        codecs.append("zstd")
+    return ", ".join(codecs)
+
+
+def latency_stats(latencies: list[float]) -> dict[str, float]:
+    """Mean, std and p50/p95/p99 of latencies in seconds (inf if none succeeded)"""
+    import numpy as np
+
+    if not latencies:
+        return dict.fromkeys(("mean", "std", "p50", "p95", "p99"), float("inf"))
+    arr = np.asarray(latencies, dtype=np.float64)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "mean": float(arr.mean()),
+        "std": float(arr.std()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+    }
+
+
+def seconds(latencies_ns: list[float]) -> tuple[float, list[float]]:
+    """Average latency and per-request latencies, converted from ns to seconds"""
+    latencies = [ns / 1e9 for ns in latencies_ns]
+    avg_latency = sum(latencies) / len(latencies) if latencies else float("inf")
+    return avg_latency, latencies
+
+
+def throughput(completed: int, wall_ns: int) -> float:
+    """Completed operations per second over a wall-clock span"""
+    return completed * 1e9 / wall_ns if wall_ns else 0.0
+
+
+class BenchmarkRunner(BufferedReport):
     """Benchmark runner for GhostWire Refractory"""
 
-    def __init__(self, controller_url: str = None):
-        self.controller_url = controller_url or settings.LOCAL_OLLAMA_URL
-        self.client = httpx.AsyncClient(timeout=30.0)
+    def __init__(
+        self,
+        controller_url: str = None,
+        concurrency: int = 8,
+        batch: bool = True,
+        compression: str = "off",
+    ):
+        from ghostwire.config.settings import settings
 
-    async def test_embedding_performance(
-        self, model: str, text: str, iterations: int = 10
-    ) -> tuple[float, list[float], float]:
-        """Test embedding performance and stability"""
-        latencies = []
-        embeddings = []
+        super().__init__()
+        self.controller_url = controller_url or settings.LOCAL_OLLAMA_URL
+        self.embed_dim = settings.EMBED_DIM
+        self.compression = compression
+        self.client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=CLIENT_LIMITS,
+            headers={"Accept-Encoding": accept_encoding(compression)},
+        )
+        self.concurrency = concurrency  # Requests in flight per test
+        self.batch = batch  # Send embedding inputs as one list-valued request
+        # Endpoint URLs are built and parsed once, not per request
+        self._url_embed = httpx.URL(f"{self.controller_url}/api/embeddings")
+        self._url_memory = httpx.URL(f"{self.controller_url}/api/v1/chat/memory")
+        self._url_vector_query = httpx.URL(
+            f"{self.controller_url}/api/v1/vectors/query"
+        )
 
-        for _ in range(iterations):
-            start_time = time.perf_counter()
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        self._flush_report()
+        await self.client.aclose()
+
+    async def _timed_post(
+        self, sem: asyncio.Semaphore, url: httpx.URL, body: bytes, what: str
+    ) -> tuple[int, httpx.Response] | None:
+        """
+        POST a pre-serialized JSON body under the concurrency limit.
+        Returns (latency_ns, response), or None if the request failed.
+        """
+        async with sem:
+            start_ns = time.perf_counter_ns()
             try:
                 response = await self.client.post(
-                    f"{self.controller_url}/api/embeddings",
-                    json={"input": text, "model": model},
+                    url, content=body, headers=JSON_HEADERS
                 )
                 response.raise_for_status()
-                latency = time.perf_counter() - start_time
-                latencies.append(latency)
-
-                # Store the embedding to calculate stability
-                data = response.json()
-                embedding = data.get("data", [{}])[0].get("embedding", [])
-                if embedding:
-                    embeddings.append(np.array(embedding))
             except Exception as e:
-                print(f"Embedding request failed: {e}")
-                continue
+                print(f"{what} request failed: {e}")
+                return None
+            return time.perf_counter_ns() - start_ns, response
+
+    async def _timed_posts(
+        self, url: httpx.URL, bodies: list[bytes], what: str
+    ) -> tuple[list[int], list[httpx.Response], int]:
+        """
+        POST every body concurrently, bounded by self.concurrency.
+        Returns the latencies (ns) and responses of the requests that succeeded,
+        plus the wall-clock time (ns) of the whole batch.
+        """
+        sem = asyncio.Semaphore(self.concurrency)
+        start_ns = time.perf_counter_ns()
+        outcomes = await asyncio.gather(
+            *(self._timed_post(sem, url, body, what) for body in bodies)
+        )
+        wall_ns = time.perf_counter_ns() - start_ns
+        succeeded = [outcome for outcome in outcomes if outcome is not None]
+        return (
+            [latency for latency, _ in succeeded],
+            [resp for _, resp in succeeded],
+            wall_ns,
+        )
 
-        avg_latency = sum(latencies) / len(latencies) if latencies else float("inf")
+    async def test_embedding_performance(
+        self, model: str, text: str, iterations: int = 10
+    ) -> tuple[float, list[float], float, float]:
+        """
+        Test embedding performance and stability.
+        Returns (avg latency, latencies, stability, embeddings per second).
+        """
+        from ghostwire.utils.vector_utils import embedding_stability
+
+        if self.batch:
+            # All inputs in one round-trip; the server embeds them in one pass
+            bodies = [orjson.dumps({"input": [text] * iterations, "model": model})]
+        else:
+            bodies = [orjson.dumps({"input": text, "model": model})] * iterations
+        latencies_ns, responses, wall_ns = await self._timed_posts(
+            self._url_embed, bodies, "Embedding"
+        )
+        if self.batch:
+            latencies_ns = [ns / iterations for ns in latencies_ns]  # Per item
 
         # Calculate embedding stability (consistency) using cosine similarity
-        stability = 1.0  # Default perfect stability
-        if len(embeddings) > 1:
-            similarities = []
-            for i in range(len(embeddings)):
-                for j in range(i + 1, len(embeddings)):
-                    similarity = np.dot(embeddings[i], embeddings[j]) / (
-                        np.linalg.norm(embeddings[i]) * np.linalg.norm(embeddings[j])
-                    )
-                    similarities.append(similarity)
-            stability = np.mean(similarities) if similarities else 1.0
-
-        return avg_latency, latencies, stability
+        stability, n_valid = embedding_stability(
+            (response.content for response in responses), iterations
+        )
 
-    async def test_memory_storage_performance(
-        self, iterations: int = 10
-    ) -> tuple[float, list[float]]:
-        """Test memory storage performance"""
-        latencies = []
+        if responses:
+            # Response size sanity check: decoded vs on-the-wire bytes
+            body_bytes = sum(len(response.content) for response in responses)
+            wire_bytes = sum(response.num_bytes_downloaded for response in responses)
+            self._report(
+                f"  Response size: {body_bytes // len(responses)} B decoded, "
+                f"{wire_bytes // len(responses)} B on the wire"
+            )
+            if self.compression != "off" and not any(
+                "content-encoding" in response.headers for response in responses
+            ):
+                self._report("  Note: the controller sent uncompressed responses")
 
-        for i in range(iterations):
-            text = f"Test memory entry {i} for performance evaluation"
-            embedding = [0.1] * settings.EMBED_DIM  # Mock embedding
+        avg_latency, latencies = seconds(latencies_ns)
 
-            start_time = time.perf_counter()
-            try:
-                response = await self.client.post(
-                    f"{self.controller_url}/api/v1/chat/memory",
-                    json={
-                        "session_id": "benchmark_session",
-                        "text": text,
-                        "embedding": embedding,
-                    },
-                )
-                response.raise_for_status()
-                latency = time.perf_counter() - start_time
-                latencies.append(latency)
-            except Exception as e:
-                print(f"Memory storage request failed: {e}")
-                continue
+        return avg_latency, latencies, stability, throughput(n_valid, wall_ns)
 
-        avg_latency = sum(latencies) / len(latencies) if latencies else float("inf")
-        return avg_latency, latencies
+    async def test_memory_storage_performance(
+        self, iterations: int = 10
+    ) -> tuple[float, list[float], float]:
+        """
+        Test memory storage performance.
+        Returns (avg latency, latencies, requests per second).
+        """
+        # Serialize the mock embedding once; only the text differs per request
+        embedding = orjson.Fragment(orjson.dumps([0.1] * self.embed_dim))
+        bodies = [
+            orjson.dumps(
+                {
+                    "session_id": "benchmark_session",
+                    "text": f"Test memory entry {i} for performance evaluation",
+                    "embedding": embedding,
+                }
+            )
+            for i in range(iterations)
+        ]
+        latencies_ns, _, wall_ns = await self._timed_posts(
+            self._url_memory, bodies, "Memory storage"
+        )
+        return *seconds(latencies_ns), throughput(len(latencies_ns), wall_ns)
 
     async def test_similarity_search_performance(
         self, iterations: int = 10
-    ) -> tuple[float, list[float]]:
-        """Test similarity search performance"""
-        latencies = []
+    ) -> tuple[float, list[float], float]:
+        """
+        Test similarity search performance.
+        Returns (avg latency, latencies, requests per second).
+        """
+        # Every iteration sends the same mock query, so serialize it once
+        body = orjson.dumps(
+            {
+                "namespace": "benchmark_session",
+                "embedding": [0.1] * self.embed_dim,  # Mock query embedding
+                "top_k": 5,
+            }
+        )
+        latencies_ns, _, wall_ns = await self._timed_posts(
+            self._url_vector_query, [body] * iterations, "Similarity search"
+        )
+        return *seconds(latencies_ns), throughput(len(latencies_ns), wall_ns)
+
+    async def run_full_benchmark(self):
+        """Run the complete benchmark suite"""
+        import psutil
+        from ghostwire.utils.ghostwire_scoring import compute_general_ghostwire_score
 
-        for _ in range(iterations):
-            query_embedding = [0.1] * settings.EMBED_DIM  # Mock query embedding
+        self._report("🚀 Starting GhostWire Refractory Benchmark Suite")
+        self._report("=" * 60)
 
-            start_time = time.perf_counter()
-            try:
-                response = await self.client.post(
-                    f"{self.controller_url}/api/v1/vectors/query",
-                    json={
-                        "namespace": "benchmark_session",
-                        "embedding": query_embedding,
-                        "top_k": 5,
-                    },
-                )
-                response.raise_for_status()
-                latency = time.perf_counter() - start_time
-                latencies.append(latency)
-            except Exception as e:
-                print(f"Similarity search request failed: {e}")
-                continue
+        # Load the numpy-backed helpers the tests import lazily before taking
+        # the baseline, so module loading isn't counted as benchmark memory
+        importlib.import_module("ghostwire.utils.vector_utils")
 
-        avg_latency = sum(latencies) / len(latencies) if latencies else float("inf")
-        return avg_latency, latencies
+        # Start memory monitoring: sample this process's RSS in the background
+        # and keep the peak, so other processes on the host don't leak in
+        proc = psutil.Process()
+        baseline_rss = peak_rss = proc.memory_info().rss
+        stop_sampling = asyncio.Event()
 
-    async def run_full_benchmark(self):
-        """Run the complete benchmark suite"""
-        print("🚀 Starting GhostWire Refractory Benchmark Suite")
-        print("=" * 60)
+        async def sample_memory():
+            nonlocal peak_rss
+            while not stop_sampling.is_set():
+                peak_rss = max(peak_rss, proc.memory_info().rss)
+                await asyncio.sleep(0.05)
 
-        # Start memory monitoring
-        initial_memory = psutil.virtual_memory().used / (1024**3)  # GB
+        sampler = asyncio.create_task(sample_memory())
 
         # Test embedding performance
-        print("\n📝 Testing Embedding Performance...")
+        self._report("\n📝 Testing Embedding Performance...")
         (
             avg_emb_lat,
-            latencies,
+            emb_latencies,
             embedding_stability,
+            emb_throughput,
         ) = await self.test_embedding_performance(
             model="nomic-embed-text",
             text="This is a test sentence for embedding performance evaluation.",
             iterations=5,
         )
-        print(f"  Average embedding latency: {avg_emb_lat:.4f}s")
-        print(f"  Embedding stability: {embedding_stability:.4f}")
+        emb_stats = latency_stats(emb_latencies)
+        self._report(f"  Average embedding latency: {avg_emb_lat:.4f}s")
+        self._report(
+            f"  p50/p95/p99: {emb_stats['p50']:.4f}s / {emb_stats['p95']:.4f}s / "
+            f"{emb_stats['p99']:.4f}s (std {emb_stats['std']:.4f}s)"
+        )
+        self._report(f"  Throughput: {emb_throughput:.1f} embeddings/s")
+        self._report(f"  Embedding stability: {embedding_stability:.4f}")
 
         # Test memory storage
-        print("\n💾 Testing Memory Storage Performance...")
-        avg_store_lat, _ = await self.test_memory_storage_performance(iterations=5)
-        print(f"  Average memory storage latency: {avg_store_lat:.4f}s")
+        self._report("\n💾 Testing Memory Storage Performance...")
+        (
+            avg_store_lat,
+            store_latencies,
+            store_throughput,
+        ) = await self.test_memory_storage_performance(iterations=5)
+        store_stats = latency_stats(store_latencies)
+        self._report(f"  Average memory storage latency: {avg_store_lat:.4f}s")
+        self._report(
+            f"  p50/p95/p99: {store_stats['p50']:.4f}s / {store_stats['p95']:.4f}s / "
+            f"{store_stats['p99']:.4f}s (std {store_stats['std']:.4f}s)"
+        )
+        self._report(f"  Throughput: {store_throughput:.1f} req/s")
 
         # Test similarity search
-        print("\n🔍 Testing Similarity Search Performance...")
-        avg_search_lat, _ = await self.test_similarity_search_performance(iterations=5)
-        print(f"  Average similarity search latency: {avg_search_lat:.4f}s")
+        self._report("\n🔍 Testing Similarity Search Performance...")
+        (
+            avg_search_lat,
+            search_latencies,
+            search_throughput,
+        ) = await self.test_similarity_search_performance(iterations=5)
+        search_stats = latency_stats(search_latencies)
+        self._report(f"  Average similarity search latency: {avg_search_lat:.4f}s")
+        self._report(
+            f"  p50/p95/p99: {search_stats['p50']:.4f}s / {search_stats['p95']:.4f}s / "
+            f"{search_stats['p99']:.4f}s (std {search_stats['std']:.4f}s)"
+        )
+        self._report(f"  Throughput: {search_throughput:.1f} req/s")
 
-        # Memory usage difference
-        final_memory = psutil.virtual_memory().used / (1024**3)  # GB
-        memory_diff = final_memory - initial_memory
-        print(f"\n📊 Memory usage difference: {memory_diff:.3f} GB")
+        # Peak memory usage over the baseline
+        stop_sampling.set()
+        await sampler
+        peak_rss = max(peak_rss, proc.memory_info().rss)
+        memory_diff = (peak_rss - baseline_rss) / (1024**3)  # GB
+        self._report(f"\n📊 Memory usage difference: {memory_diff:.3f} GB")
 
-        print("\n✅ Benchmark suite completed!")
-        print("=" * 60)
+        self._report("\n✅ Benchmark suite completed!")
+        self._report("=" * 60)
 
         # Calculate GHOSTWIRE scores
         embedding_ghostwire_score = compute_general_ghostwire_score(
@@ -195,17 +349,37 @@ class BenchmarkRunner:
             memory_usage=memory_diff,
         )
 
-        print("\n🏆 GHOSTWIRE SCORES:")
-        print(f"  Embedding Performance Score: {embedding_ghostwire_score:.4f}")
-        print(f"  Memory Storage Performance Score: {storage_ghostwire_score:.4f}")
-        print(f"  Similarity Search Performance Score: {search_ghostwire_score:.4f}")
-        print(f"  Overall GHOSTWIRE Score: {overall_ghostwire_score:.4f}")
+        self._report("\n🏆 GHOSTWIRE SCORES:")
+        self._report(f"  Embedding Performance Score: {embedding_ghostwire_score:.4f}")
+        self._report(
+            f"  Memory Storage Performance Score: {storage_ghostwire_score:.4f}"
+        )
+        self._report(
+            f"  Similarity Search Performance Score: {search_ghostwire_score:.4f}"
+        )
+        self._report(f"  Overall GHOSTWIRE Score: {overall_ghostwire_score:.4f}")
+
+        distribution = {
+            f"{name}_latency_{stat}": value
+            for name, stats in (
+                ("embedding", emb_stats),
+                ("storage", store_stats),
+                ("search", search_stats),
+            )
+            for stat, value in stats.items()
+            if stat != "mean"
+        }
 
+        self._flush_report()
         return {
             "embedding_latency": avg_emb_lat,
             "embedding_stability": embedding_stability,
             "storage_latency": avg_store_lat,
             "search_latency": avg_search_lat,
+            **distribution,
+            "embedding_throughput": emb_throughput,
+            "storage_throughput": store_throughput,
+            "search_throughput": search_throughput,
             "memory_usage_gb": memory_diff,
             "embedding_ghostwire_score": embedding_ghostwire_score,
             "storage_ghostwire_score": storage_ghostwire_score,
@@ -219,17 +393,43 @@ async def main():
     parser.add_argument(
         "--controller",
         type=str,
-        default=settings.LOCAL_OLLAMA_URL,
-        help="Controller URL for benchmarking",
+        default=None,
+        help="Controller URL for benchmarking (default: LOCAL_OLLAMA_URL setting)",
     )
     parser.add_argument(
         "--iterations", type=int, default=5, help="Number of iterations for each test"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum concurrent requests per test",
+    )
+    parser.add_argument(
+        "--no-batch",
+        action="store_true",
+        help="Send one embedding request per input (for servers without list input)",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=("auto", "off", "zstd"),
+        default="off",
+        help="Response compression to negotiate (off suits a local controller)",
+    )
 
     args = parser.parse_args()
+    if args.compression == "zstd" and not importlib.util.find_spec("zstandard"):
+        parser.error("--compression zstd needs the zstandard package")
+
+    from ghostwire.utils.ghostwire_scoring import format_benchmark_results_with_scores
 
-    benchmark_runner = BenchmarkRunner(controller_url=args.controller)
-    results = await benchmark_runner.run_full_benchmark()
+    async with BenchmarkRunner(
+        controller_url=args.controller,
+        concurrency=args.concurrency,
+        batch=not args.no_batch,
+        compression=args.compression,
+    ) as benchmark_runner:
+        results = await benchmark_runner.run_full_benchmark()
 
     print("\n📈 FINAL RESULTS:")
     print(f"  Embedding Latency: {results['embedding_latency']:.4f}s")
@@ -250,4 +450,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -11,68 +11,107 @@ import time
 
 import httpx
 import numpy as np
+import orjson
 
 # Add the python directory to the path to access ghostwire modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+from benchmarks.common import CLIENT_LIMITS, BufferedReport, run
 from ghostwire.config.settings import settings
 from ghostwire.utils.ghostwire_scoring import (
     compute_general_ghostwire_score,
     compute_rag_ghostwire_score,
     compute_summarization_ghostwire_score,
 )
+from ghostwire.utils.http import HTTP2_AVAILABLE
+from ghostwire.utils.vector_utils import embedding_stability
 
+JSON_HEADERS = {"content-type": "application/json"}
 
-class ModelComparisonBenchmark:
+
+def avg_seconds(latencies_ns: list[float]) -> float:
+    """Mean of nanosecond latencies in seconds (inf if none succeeded)"""
+    return sum(latencies_ns) / len(latencies_ns) / 1e9 if latencies_ns else float("inf")
+
+
+class ModelComparisonBenchmark(BufferedReport):
     """Benchmark class for comparing different models using GHOSTWIRE scores"""
 
-    def __init__(self, controller_url: str = None):
+    def __init__(
+        self, controller_url: str = None, batch: bool = True, model_concurrency: int = 1
+    ):
+        super().__init__()
         self.controller_url = controller_url or "http://localhost:8000"
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self.client = httpx.AsyncClient(
+            timeout=60.0, limits=CLIENT_LIMITS, http2=HTTP2_AVAILABLE
+        )
         self.models = settings.EMBED_MODELS  # Use models from settings
+        self.batch = batch  # Send embedding inputs as one list-valued request
+        # Model suites run at once; above 1 they share the server and skew latencies
+        self.model_concurrency = model_concurrency
+        self._url_embed = httpx.URL(f"{self.controller_url}/api/v1/embeddings")
+        self._url_chat_embedding = httpx.URL(
+            f"{self.controller_url}/api/v1/chat/chat_embedding"
+        )
+        self._url_chat_completion = httpx.URL(
+            f"{self.controller_url}/api/v1/chat/chat_completion"
+        )
 
-    async def test_embedding_performance_for_model(
-        self, model: str, text: str, iterations: int = 3
-    ) -> dict:
-        """Test embedding performance for a specific model"""
-        latencies = []
-        embeddings = []
-
-        for _ in range(iterations):
-            start_time = time.perf_counter()
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        self._flush_report()
+        await self.client.aclose()
+
+    async def _timed_posts(
+        self, url: httpx.URL, bodies: list[bytes], what: str
+    ) -> tuple[list[int], list[httpx.Response]]:
+        """
+        POST each pre-serialized JSON body in turn, timing every request.
+        Returns the latencies (ns) and responses of the requests that succeeded.
+        """
+        latencies_ns = []
+        responses = []
+        for body in bodies:
+            start_ns = time.perf_counter_ns()
             try:
                 response = await self.client.post(
-                    f"{self.controller_url}/api/v1/embeddings",
-                    json={"input": text, "model": model},
+                    url, content=body, headers=JSON_HEADERS
                 )
                 response.raise_for_status()
-                latency = time.perf_counter() - start_time
-                latencies.append(latency)
-
-                # Store the embedding to calculate stability
-                data = response.json()
-                embedding = data.get("data", [{}])[0].get("embedding", [])
-                if embedding:
-                    embeddings.append(np.array(embedding))
             except Exception as e:
-                print(f"Embedding request failed for model {model}: {e}")
+                print(f"{what} failed: {e}")
                 continue
+            latencies_ns.append(time.perf_counter_ns() - start_ns)
+            responses.append(response)
+        return latencies_ns, responses
 
-        avg_latency = sum(latencies) / len(latencies) if latencies else float("inf")
+    async def test_embedding_performance_for_model(
+        self, model: str, text: str, iterations: int = 3
+    ) -> dict:
+        """Test embedding performance for a specific model"""
+        if self.batch:
+            # One request carries every input: a single round-trip and forward pass
+            bodies = [orjson.dumps({"input": [text] * iterations, "model": model})]
+        else:
+            bodies = [orjson.dumps({"input": text, "model": model})] * iterations
+        latencies_ns, responses = await self._timed_posts(
+            self._url_embed, bodies, f"Embedding request for model {model}"
+        )
+        if self.batch:
+            latencies_ns = [ns / iterations for ns in latencies_ns]  # Per item
 
         # Calculate embedding stability (consistency) using cosine similarity
-        stability = 1.0  # Default perfect stability
-        if len(embeddings) > 1:
-            similarities = []
-            for i in range(len(embeddings)):
-                for j in range(i + 1, len(embeddings)):
-                    if len(embeddings[i]) > 0 and len(embeddings[j]) > 0:
-                        similarity = np.dot(embeddings[i], embeddings[j]) / (
-                            np.linalg.norm(embeddings[i])
-                            * np.linalg.norm(embeddings[j])
-                        )
-                        similarities.append(similarity)
-            stability = np.mean(similarities) if similarities else 1.0
+        stability, _ = embedding_stability(
+            (response.content for response in responses), iterations
+        )
+
+        avg_latency = avg_seconds(latencies_ns)
 
         return {
             "avg_latency": avg_latency,
@@ -84,38 +123,34 @@ class ModelComparisonBenchmark:
         self, model: str, query: str, iterations: int = 3
     ) -> dict:
         """Test RAG performance for a specific model"""
-        latencies = []
-
-        for _ in range(iterations):
-            start_time = time.perf_counter()
-            try:
-                # First get embedding for the query
-                embedding_response = await self.client.post(
-                    f"{self.controller_url}/api/v1/embeddings",
-                    json={"input": query, "model": model},
-                )
-                embedding_response.raise_for_status()
-                embedding_data = embedding_response.json()
-                embedding = embedding_data["data"][0]["embedding"]
-
-                # Then make the RAG query
-                rag_response = await self.client.post(
-                    f"{self.controller_url}/api/v1/chat/chat_embedding",
-                    json={
-                        "session_id": "model_comparison_session",
-                        "text": query,
-                        "embedding": embedding,
-                    },
-                )
-                rag_response.raise_for_status()
-
-                latency = time.perf_counter() - start_time
-                latencies.append(latency)
-            except Exception as e:
-                print(f"RAG query failed for model {model}: {e}")
-                continue
+        # The query embedding is the same every iteration: fetch it once,
+        # untimed, and time only the RAG requests that reuse it
+        try:
+            embedding_response = await self.client.post(
+                self._url_embed,
+                json={"input": query, "model": model},
+            )
+            embedding_response.raise_for_status()
+            embedding = np.asarray(
+                orjson.loads(embedding_response.content)["data"][0]["embedding"],
+                dtype=np.float32,
+            )
+        except Exception as e:
+            print(f"RAG query failed for model {model}: {e}")
+            latencies_ns = []
+        else:
+            payload = {
+                "session_id": "model_comparison_session",
+                "text": query,
+                "embedding": embedding,
+            }
+            latencies_ns, _ = await self._timed_posts(
+                self._url_chat_embedding,
+                [orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)] * iterations,
+                f"RAG query for model {model}",
+            )
 
-        avg_latency = sum(latencies) / len(latencies) if latencies else float("inf")
+        avg_latency = avg_seconds(latencies_ns)
 
         # Placeholder values for quality metrics - in a real implementation,
         # we would evaluate the quality of the response
@@ -133,29 +168,19 @@ class ModelComparisonBenchmark:
         self, model: str, text: str, iterations: int = 3
     ) -> dict:
         """Test summarization performance for a specific model"""
-        latencies = []
-
-        for _ in range(iterations):
-            start_time = time.perf_counter()
-            try:
-                # Test using the chat completion endpoint for summarization
-                response = await self.client.post(
-                    f"{self.controller_url}/api/v1/chat/chat_completion",
-                    json={
-                        "session_id": "summarization_comparison",
-                        "text": f"Please summarize the following text: {text}",
-                        "model": model,
-                    },
-                )
-                response.raise_for_status()
-
-                latency = time.perf_counter() - start_time
-                latencies.append(latency)
-            except Exception as e:
-                print(f"Summarization request failed for model {model}: {e}")
-                continue
+        # Test using the chat completion endpoint for summarization
+        payload = {
+            "session_id": "summarization_comparison",
+            "text": f"Please summarize the following text: {text}",
+            "model": model,
+        }
+        latencies_ns, _ = await self._timed_posts(
+            self._url_chat_completion,
+            [orjson.dumps(payload)] * iterations,
+            f"Summarization request for model {model}",
+        )
 
-        avg_latency = sum(latencies) / len(latencies) if latencies else float("inf")
+        avg_latency = avg_seconds(latencies_ns)
 
         # Placeholder values for quality metrics
         quality = 0.70  # Placeholder quality score
@@ -170,12 +195,71 @@ class ModelComparisonBenchmark:
             "memory_usage": 0.0,  # Placeholder, would need actual measurement
         }
 
+    async def _run_one_model(
+        self,
+        sem: asyncio.Semaphore,
+        model: str,
+        embedding_text: str,
+        rag_query: str,
+        summarization_text: str,
+    ) -> dict:
+        """Run the embedding, RAG and summarization suites for one model"""
+        async with sem:
+            embed_results = await self.test_embedding_performance_for_model(
+                model, embedding_text
+            )
+            rag_results = await self.test_rag_performance_for_model(model, rag_query)
+            summ_results = await self.test_summarization_performance_for_model(
+                model, summarization_text
+            )
+
+        # Calculate individual GHOSTWIRE scores
+        embedding_score = compute_general_ghostwire_score(
+            latency=embed_results["avg_latency"],
+            stability=embed_results["stability"],
+            memory_usage=embed_results["memory_usage"],
+        )
+
+        rag_score = compute_rag_ghostwire_score(
+            quality=rag_results["quality"],
+            hallucination=rag_results["hallucination_rate"],
+            latency=rag_results["avg_latency"],
+        )
+
+        summarization_score = compute_summarization_ghostwire_score(
+            quality=summ_results["quality"],
+            hallucination=summ_results["hallucination_rate"],
+            length_penalty=summ_results["length_penalty"],
+            latency=summ_results["avg_latency"],
+        )
+
+        # Overall score - average of all benchmark scores
+        overall_score = (embedding_score + rag_score + summarization_score) / 3
+
+        return {
+            "embedding_latency": embed_results["avg_latency"],
+            "embedding_stability": embed_results["stability"],
+            "embedding_score": embedding_score,
+            "rag_latency": rag_results["avg_latency"],
+            "rag_quality": rag_results["quality"],
+            "rag_hallucination_rate": rag_results["hallucination_rate"],
+            "rag_score": rag_score,
+            "summarization_latency": summ_results["avg_latency"],
+            "summarization_quality": summ_results["quality"],
+            "summarization_hallucination_rate": summ_results["hallucination_rate"],
+            "summarization_length_penalty": summ_results["length_penalty"],
+            "summarization_score": summarization_score,
+            "overall_score": overall_score,
+        }
+
     async def run_model_comparison(self):
         """Run the complete model comparison benchmark suite"""
-        print("🚀 Starting Model Comparison Benchmark Suite using GHOSTWIRE Scores")
-        print("=" * 80)
-        print(f"Models to be tested: {self.models}")
-        print("=" * 80)
+        self._report(
+            "🚀 Starting Model Comparison Benchmark Suite using GHOSTWIRE Scores"
+        )
+        self._report("=" * 80)
+        self._report(f"Models to be tested: {self.models}")
+        self._report("=" * 80)
 
         test_embedding_text = (
             "This is a test sentence for embedding performance evaluation."
@@ -189,109 +273,78 @@ class ModelComparisonBenchmark:
             "its chance of successfully achieving its goals."
         )
 
-        results = {}
-
-        for model in self.models:
-            print(f"\n🤖 Testing Model: {model}")
-            print("-" * 50)
-
-            # Test embedding performance
-            print("  📝 Testing Embedding Performance...")
-            embed_results = await self.test_embedding_performance_for_model(
-                model, test_embedding_text
-            )
-            print(f"    Average embedding latency: {embed_results['avg_latency']:.4f}s")
-            print(f"    Embedding stability: {embed_results['stability']:.4f}")
-
-            # Test RAG performance
-            print("  🤖 Testing RAG Performance...")
-            rag_results = await self.test_rag_performance_for_model(
-                model, test_rag_query
-            )
-            print(f"    Average RAG latency: {rag_results['avg_latency']:.4f}s")
-            print(f"    RAG quality: {rag_results['quality']:.4f}")
-            print(f"    Hallucination rate: {rag_results['hallucination_rate']:.4f}")
-
-            # Test summarization performance
-            print("  📝 Testing Summarization Performance...")
-            summ_results = await self.test_summarization_performance_for_model(
-                model, test_summarization_text
+        sem = asyncio.Semaphore(self.model_concurrency)
+        per_model = await asyncio.gather(
+            *(
+                self._run_one_model(
+                    sem,
+                    model,
+                    test_embedding_text,
+                    test_rag_query,
+                    test_summarization_text,
+                )
+                for model in self.models
             )
-            print(
-                f"    Average summarization latency: {summ_results['avg_latency']:.4f}s"
+        )
+        # Suites finish in any order; report them in the configured model order
+        results = dict(zip(self.models, per_model))
+
+        for model, data in results.items():
+            self._report(f"\n🤖 Model: {model}")
+            self._report("-" * 50)
+            self._report("  📝 Embedding Performance")
+            self._report(
+                f"    Average embedding latency: {data['embedding_latency']:.4f}s"
             )
-            print(f"    Summarization quality: {summ_results['quality']:.4f}")
-            print(
-                f"    Summarization hallucination rate: {summ_results['hallucination_rate']:.4f}"
+            self._report(f"    Embedding stability: {data['embedding_stability']:.4f}")
+            self._report("  🤖 RAG Performance")
+            self._report(f"    Average RAG latency: {data['rag_latency']:.4f}s")
+            self._report(f"    RAG quality: {data['rag_quality']:.4f}")
+            self._report(
+                f"    Hallucination rate: {data['rag_hallucination_rate']:.4f}"
             )
-
-            # Calculate individual GHOSTWIRE scores
-            embedding_score = compute_general_ghostwire_score(
-                latency=embed_results["avg_latency"],
-                stability=embed_results["stability"],
-                memory_usage=embed_results["memory_usage"],
+            self._report("  📝 Summarization Performance")
+            self._report(
+                f"    Average summarization latency: {data['summarization_latency']:.4f}s"
             )
-
-            rag_score = compute_rag_ghostwire_score(
-                quality=rag_results["quality"],
-                hallucination=rag_results["hallucination_rate"],
-                latency=rag_results["avg_latency"],
+            self._report(
+                f"    Summarization quality: {data['summarization_quality']:.4f}"
             )
-
-            summarization_score = compute_summarization_ghostwire_score(
-                quality=summ_results["quality"],
-                hallucination=summ_results["hallucination_rate"],
-                length_penalty=summ_results["length_penalty"],
-                latency=summ_results["avg_latency"],
+            self._report(
+                f"    Summarization hallucination rate: {data['summarization_hallucination_rate']:.4f}"
             )
-
-            # Overall score - average of all benchmark scores
-            overall_score = (embedding_score + rag_score + summarization_score) / 3
-
-            print(f"  🏆 GHOSTWIRE Scores for {model}:")
-            print(f"    Embedding Score: {embedding_score:.4f}")
-            print(f"    RAG Score: {rag_score:.4f}")
-            print(f"    Summarization Score: {summarization_score:.4f}")
-            print(f"    Overall Score: {overall_score:.4f}")
-
-            results[model] = {
-                "embedding_latency": embed_results["avg_latency"],
-                "embedding_stability": embed_results["stability"],
-                "embedding_score": embedding_score,
-                "rag_latency": rag_results["avg_latency"],
-                "rag_quality": rag_results["quality"],
-                "rag_hallucination_rate": rag_results["hallucination_rate"],
-                "rag_score": rag_score,
-                "summarization_latency": summ_results["avg_latency"],
-                "summarization_quality": summ_results["quality"],
-                "summarization_hallucination_rate": summ_results["hallucination_rate"],
-                "summarization_length_penalty": summ_results["length_penalty"],
-                "summarization_score": summarization_score,
-                "overall_score": overall_score,
-            }
-
-        print("\n" + "=" * 80)
-        print("🏆 FINAL MODEL COMPARISON RESULTS (Ranked by Overall GHOSTWIRE Score)")
-        print("=" * 80)
+            self._report(f"  🏆 GHOSTWIRE Scores for {model}:")
+            self._report(f"    Embedding Score: {data['embedding_score']:.4f}")
+            self._report(f"    RAG Score: {data['rag_score']:.4f}")
+            self._report(f"    Summarization Score: {data['summarization_score']:.4f}")
+            self._report(f"    Overall Score: {data['overall_score']:.4f}")
+
+        self._report("\n" + "=" * 80)
+        self._report(
+            "🏆 FINAL MODEL COMPARISON RESULTS (Ranked by Overall GHOSTWIRE Score)"
+        )
+        self._report("=" * 80)
 
         # Sort models by overall score
         sorted_models = sorted(
             results.items(), key=lambda x: x[1]["overall_score"], reverse=True
         )
 
-        print(
+        self._report(
             f"{'Rank':<4} {'Model':<25} {'Embedding':<10} {'RAG':<10} {'Summarization':<12} {'Overall':<10}"
         )
-        print("-" * 80)
+        self._report("-" * 80)
 
         for i, (model, data) in enumerate(sorted_models, 1):
-            print(
+            self._report(
                 f"{i:<4} {model:<25} {data['embedding_score']:<10.4f} "
                 f"{data['rag_score']:<10.4f} {data['summarization_score']:<12.4f} "
                 f"{data['overall_score']:<10.4f}"
             )
 
-        print("=" * 80)
+        self._report("=" * 80)
+
+        self._flush_report()
 
         # Return the results for potential further analysis
         return results
@@ -313,16 +366,33 @@ async def main():
         nargs="+",
         help="Specific models to test (if not provided, uses models from settings)",
     )
+    parser.add_argument(
+        "--no-batch",
+        action="store_true",
+        help="Send one embedding request per input (for servers without list input)",
+    )
+    parser.add_argument(
+        "--model-concurrency",
+        type=int,
+        default=1,
+        help=(
+            "Maximum number of models benchmarked at the same time; latencies "
+            "are not comparable between models above 1"
+        ),
+    )
 
     args = parser.parse_args()
 
-    benchmark = ModelComparisonBenchmark(controller_url=args.controller)
-
-    # If specific models were provided, override the default list
-    if args.models:
-        benchmark.models = args.models
+    async with ModelComparisonBenchmark(
+        controller_url=args.controller,
+        batch=not args.no_batch,
+        model_concurrency=args.model_concurrency,
+    ) as benchmark:
+        # If specific models were provided, override the default list
+        if args.models:
+            benchmark.models = args.models
 
-    await benchmark.run_model_comparison()
+        await benchmark.run_model_comparison()
 
     # Print a summary
     print("\n📋 SUMMARY:")
@@ -333,4 +403,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
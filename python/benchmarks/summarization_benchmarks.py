@@ -8,65 +8,122 @@ import sys
 import time
 
 import httpx
-import psutil
+import numpy as np
+import orjson
 
 # Add the python directory to the path to access ghostwire modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+from benchmarks.common import run
 from ghostwire.config.settings import settings
 from ghostwire.utils.ghostwire_scoring import (
     compute_general_ghostwire_score,
     compute_summarization_ghostwire_score,
     format_benchmark_results_with_scores,
 )
+from ghostwire.utils.http import aclose_shared_client, get_shared_client
+from ghostwire.utils.process_memory import rss_gb
+
+JSON_HEADERS = {"content-type": "application/json"}
+# Runs are appended here as JSON lines (GHOSTWIRE_BENCH_HISTORY="" disables)
+BENCH_HISTORY = os.getenv("GHOSTWIRE_BENCH_HISTORY", "bench_history.jsonl")
 
 
 class SummarizationBenchmark:
     """Benchmark class for text summarization performance"""
 
-    def __init__(self, controller_url: str = None):
-        self.controller_url = controller_url or "http://localhost:8000"
-        self.client = httpx.AsyncClient(timeout=60.0)
+    SESSION_ID = "summarization_benchmark"
 
-    async def test_summarization(
-        self, text: str, model: str = None, iterations: int = 5
-    ) -> tuple[float, list[float], float, float, float]:
-        """Test summarization performance and quality"""
-        latencies = []
-        memory_deltas = []
-        model = model or settings.SUMMARY_MODEL
+    def __init__(
+        self,
+        controller_url: str = None,
+        concurrency: int = 8,
+        warmup_iterations: int = 1,
+    ):
+        self.controller_url = controller_url or "http://localhost:8000"
+        self.concurrency = concurrency  # Summarization requests in flight per test
+        # Discarded requests per text, so the first model load isn't averaged in
+        self.warmup_iterations = warmup_iterations
+        self._url_chat_completion = httpx.URL(
+            f"{self.controller_url}/api/v1/chat/chat_completion"
+        )
 
-        for i in range(iterations):
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client, resolved on every use instead of held by the instance"""
+        return get_shared_client()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the shared HTTP client (other instances reopen it on next use)"""
+        await aclose_shared_client()
+
+    async def _timed_post(
+        self, sem: asyncio.Semaphore, url: httpx.URL, body: bytes
+    ) -> tuple[int, float] | None:
+        """
+        POST a pre-serialized summarization request under the concurrency limit.
+        Returns (latency_ns, memory_delta) or None if the request failed.
+        """
+        async with sem:
             # Record memory before
-            memory_before = psutil.virtual_memory().used / (1024**3)  # GB
+            memory_before = rss_gb()
 
-            start_time = time.perf_counter()
+            start_ns = time.perf_counter_ns()
             try:
-                # For now, we'll test using the chat completion endpoint
-                # In a full implementation, this would call a dedicated
-                # summarization endpoint
                 response = await self.client.post(
-                    f"{self.controller_url}/api/v1/chat/chat_completion",
-                    json={
-                        "session_id": "summarization_benchmark",
-                        "text": f"Please summarize the following text: {text}",
-                    },
+                    url, content=body, headers=JSON_HEADERS
                 )
                 response.raise_for_status()
 
-                latency = time.perf_counter() - start_time
-
-                # Record memory after
-                memory_after = psutil.virtual_memory().used / (1024**3)  # GB
-                memory_delta = memory_after - memory_before
-
-                latencies.append(latency)
-                memory_deltas.append(memory_delta)
+                latency_ns = time.perf_counter_ns() - start_ns
             except Exception as e:
                 print(f"Summarization request failed: {e}")
-                continue
+                return None
 
-        avg_latency = sum(latencies) / len(latencies) if latencies else float("inf")
+            # Record memory after
+            memory_after = rss_gb()
+            return latency_ns, memory_after - memory_before
+
+    async def test_summarization(
+        self, text: str, model: str = None, iterations: int = 5
+    ) -> tuple[float, list[float], float, float, float]:
+        """Test summarization performance and quality"""
+        model = model or settings.SUMMARY_MODEL
+
+        # For now, we'll test using the chat completion endpoint
+        # In a full implementation, this would call a dedicated
+        # summarization endpoint
+        body = orjson.dumps(
+            {
+                "session_id": self.SESSION_ID,
+                "text": f"Please summarize the following text: {text}",
+            }
+        )
+        sem = asyncio.Semaphore(self.concurrency)
+        for _ in range(self.warmup_iterations):
+            await self._timed_post(sem, self._url_chat_completion, body)
+        outcomes = await asyncio.gather(
+            *(
+                self._timed_post(sem, self._url_chat_completion, body)
+                for _ in range(iterations)
+            )
+        )
+        measured = [outcome for outcome in outcomes if outcome is not None]
+        latencies_ns = [ns for ns, _ in measured]
+        memory_deltas = [delta for _, delta in measured]
+
+        avg_latency = (
+            sum(latencies_ns) / len(latencies_ns) / 1e9
+            if latencies_ns
+            else float("inf")
+        )
+        latencies = [ns / 1e9 for ns in latencies_ns]
         avg_memory_delta = (
             sum(memory_deltas) / len(memory_deltas) if memory_deltas else 0.0
         )
@@ -114,6 +171,7 @@ class SummarizationBenchmark:
         quality_results = []
         hallucination_results = []
         length_penalty_results = []
+        request_latencies = []
 
         for i, text in enumerate(test_texts):
             print(f"  Testing with text {i + 1} ({len(text)} chars)...")
@@ -130,32 +188,37 @@ class SummarizationBenchmark:
             quality_results.append(quality)
             hallucination_results.append(hallucination_rate)
             length_penalty_results.append(length_penalty)
+            request_latencies.extend(latencies)
             print(f"    Average latency: {avg_lat:.4f}s")
             print(f"    Average memory: {avg_memory:.4f} GB")
             print(f"    Quality: {quality:.4f}")
             print(f"    Hallucination rate: {hallucination_rate:.4f}")
             print(f"    Length penalty: {length_penalty:.4f}")
 
-        overall_avg_latency = (
-            sum(latency_results) / len(latency_results)
-            if latency_results
-            else float("inf")
-        )
-        overall_avg_memory = (
-            sum(memory_results) / len(memory_results) if memory_results else 0.0
+        # One row per metric, one column per test text
+        (
+            overall_avg_latency,
+            overall_avg_memory,
+            overall_avg_quality,
+            overall_avg_hallucination,
+            overall_avg_length_penalty,
+        ) = (
+            np.array(
+                [
+                    latency_results,
+                    memory_results,
+                    quality_results,
+                    hallucination_results,
+                    length_penalty_results,
+                ]
+            )
+            .mean(axis=1)
+            .tolist()
         )
-        overall_avg_quality = (
-            sum(quality_results) / len(quality_results) if quality_results else 0.0
-        )
-        overall_avg_hallucination = (
-            sum(hallucination_results) / len(hallucination_results)
-            if hallucination_results
-            else 0.0
-        )
-        overall_avg_length_penalty = (
-            sum(length_penalty_results) / len(length_penalty_results)
-            if length_penalty_results
-            else 0.0
+        latency_p50, latency_p95, latency_p99 = (
+            np.percentile(request_latencies, [50, 95, 99]).tolist()
+            if request_latencies
+            else [float("inf")] * 3
         )
 
         print("\n✅ Summarization benchmark suite completed!")
@@ -183,6 +246,9 @@ class SummarizationBenchmark:
             "average_quality": overall_avg_quality,
             "average_hallucination_rate": overall_avg_hallucination,
             "average_length_penalty": overall_avg_length_penalty,
+            "latency_p50": latency_p50,
+            "latency_p95": latency_p95,
+            "latency_p99": latency_p99,
             "individual_latency_results": latency_results,
             "individual_memory_results": memory_results,
             "individual_quality_results": quality_results,
@@ -194,23 +260,23 @@ class SummarizationBenchmark:
 
 
 async def main():
-    benchmark = SummarizationBenchmark()
-    results = await benchmark.run_summarization_benchmark()
+    async with SummarizationBenchmark() as benchmark:
+        results = await benchmark.run_summarization_benchmark()
 
-    print("\n📈 SUMMARIZATION BENCHMARK RESULTS:")
-    print(f"  Overall Average Latency: {results['average_latency']:.4f}s")
-    print(f"  Overall Average Memory: {results['average_memory']:.4f} GB")
-    print(f"  Overall Average Quality: {results['average_quality']:.4f}")
-    print(
-        f"  Overall Average Hallucination Rate: {results['average_hallucination_rate']:.4f}"
-    )
-    print(f"  Overall Average Length Penalty: {results['average_length_penalty']:.4f}")
-    print(
-        f"  Summarization GHOSTWIRE Score: {results['summarization_ghostwire_score']:.4f}"
-    )
-    print(
-        f"  General Performance GHOSTWIRE Score: {results['general_performance_ghostwire_score']:.4f}"
+    print("\n📈 SUMMARIZATION BENCHMARK RESULTS:", flush=True)
+    sys.stdout.buffer.write(
+        orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        + b"\n"
     )
+    sys.stdout.buffer.flush()
+    if BENCH_HISTORY:
+        with open(BENCH_HISTORY, "ab") as f:
+            f.write(
+                orjson.dumps(
+                    {"ts": time.time(), **results}, option=orjson.OPT_SERIALIZE_NUMPY
+                )
+                + b"\n"
+            )
 
     # Also print formatted results with GHOSTWIRE scoring
     print(
@@ -222,4 +288,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run(main())
@@ -3,15 +3,27 @@ GhostWire Operator Console - Client Application
 """
 
 import asyncio
+import hashlib
 import os
 import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 import httpx
+import numpy as np
+import orjson
 
 # Add the python directory to the path to access ghostwire modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+from ghostwire.utils.http import aclose_shared_client, get_shared_client
+
+EMBED_MODEL = "nomic-embed-text"
+EMBEDDING_CACHE_SIZE = 256  # Distinct texts remembered per console session
+JSON_HEADERS = {"content-type": "application/json"}
+
 
 class OperatorConsoleClient:
     """Client for interacting with the GhostWire Refractory API"""
@@ -19,30 +31,73 @@ class OperatorConsoleClient:
     def __init__(self):
         self.base_url = os.getenv("CONTROLLER_URL", "http://localhost:8000")
         self.session_id = "default_session"
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # (model, text digest) -> embedding, least recently used first
+        self._embedding_cache: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        # Embedding requests still in flight, by the same key as the cache
+        self._inflight: dict[tuple[str, str], asyncio.Task[np.ndarray]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled keep-alive client shared process-wide, fetched per request"""
+        return get_shared_client()
+
+    async def _get_embedding(self, text: str, model: str = EMBED_MODEL) -> np.ndarray:
+        """
+        Get the embedding for text, reusing the cached vector when the same text
+        (ignoring whitespace differences) was embedded earlier in the session.
+        Concurrent calls for the same text share one embeddings request.
+        """
+        digest = hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+        key = (model, digest)
+        embedding = self._embedding_cache.get(key)
+        if embedding is not None:
+            self._embedding_cache.move_to_end(key)
+            return embedding
+
+        fetch = self._inflight.get(key)
+        if fetch is None:
+            fetch = asyncio.create_task(self._fetch_embedding(text, model, key))
+            self._inflight[key] = fetch
+            fetch.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one cancelled caller doesn't cancel the others' request
+        return await asyncio.shield(fetch)
+
+    async def _fetch_embedding(
+        self, text: str, model: str, key: tuple[str, str]
+    ) -> np.ndarray:
+        """Request an embedding from the API and add it to the cache"""
+        embedding_response = await self.client.post(
+            f"{self.base_url}/api/v1/embeddings",
+            content=orjson.dumps({"input": text, "model": model}),
+            headers=JSON_HEADERS,
+        )
+        embedding_response.raise_for_status()
+        # Kept as a float32 array: 4 bytes per element instead of a boxed float
+        embedding = np.asarray(
+            orjson.loads(embedding_response.content)["data"][0]["embedding"],
+            dtype=np.float32,
+        )
+
+        self._embedding_cache[key] = embedding
+        if len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+            self._embedding_cache.popitem(last=False)
+        return embedding
 
     async def chat_with_embedding(self, text: str, session_id: str = None) -> str:
         """Send a chat message with embedding to the API"""
         session_id = session_id or self.session_id
 
         # Get embedding for the text
-        embedding_response = await self.client.post(
-            f"{self.base_url}/api/v1/embeddings",
-            json={
-                "input": text,
-                "model": "nomic-embed-text",
-            },  # Use appropriate embedding model
-        )
-        embedding_response.raise_for_status()
-        embedding_data = embedding_response.json()
-
-        # Extract embedding
-        embedding = embedding_data["data"][0]["embedding"]
+        embedding = await self._get_embedding(text)
 
         # Send chat request with embedding
         chat_response = await self.client.post(
             f"{self.base_url}/api/v1/chat/chat_embedding",
-            json={"session_id": session_id, "text": text, "embedding": embedding},
+            content=orjson.dumps(
+                {"session_id": session_id, "text": text, "embedding": embedding},
+                option=orjson.OPT_SERIALIZE_NUMPY,
+            ),
+            headers=JSON_HEADERS,
         )
         chat_response.raise_for_status()
 
@@ -53,24 +108,20 @@ class OperatorConsoleClient:
         session_id = session_id or self.session_id
 
         # Get embedding for the text
-        embedding_response = await self.client.post(
-            f"{self.base_url}/api/v1/embeddings",
-            json={"input": text, "model": "nomic-embed-text"},
-        )
-        embedding_response.raise_for_status()
-        embedding_data = embedding_response.json()
-
-        # Extract embedding
-        embedding = embedding_data["data"][0]["embedding"]
+        embedding = await self._get_embedding(text)
 
         # Add memory
         response = await self.client.post(
             f"{self.base_url}/api/v1/chat/memory",
-            json={"session_id": session_id, "text": text, "embedding": embedding},
+            content=orjson.dumps(
+                {"session_id": session_id, "text": text, "embedding": embedding},
+                option=orjson.OPT_SERIALIZE_NUMPY,
+            ),
+            headers=JSON_HEADERS,
         )
         response.raise_for_status()
 
-        return response.json()
+        return orjson.loads(response.content)
 
     async def query_similar_memories(
         self, query: str, session_id: str = None, top_k: int = 5
@@ -79,31 +130,80 @@ class OperatorConsoleClient:
         session_id = session_id or self.session_id
 
         # Get embedding for the query
-        embedding_response = await self.client.post(
-            f"{self.base_url}/api/v1/embeddings",
-            json={"input": query, "model": "nomic-embed-text"},
-        )
-        embedding_response.raise_for_status()
-        embedding_data = embedding_response.json()
-
-        # Extract embedding
-        embedding = embedding_data["data"][0]["embedding"]
+        embedding = await self._get_embedding(query)
 
         # Query vectors
         response = await self.client.post(
             f"{self.base_url}/api/v1/vectors/query",
-            json={"namespace": session_id, "embedding": embedding, "top_k": top_k},
+            content=orjson.dumps(
+                {"namespace": session_id, "embedding": embedding, "top_k": top_k},
+                option=orjson.OPT_SERIALIZE_NUMPY,
+            ),
+            headers=JSON_HEADERS,
         )
         response.raise_for_status()
 
-        return response.json()
+        return orjson.loads(response.content)
 
     async def health_check(self) -> dict[str, Any]:
         """Check the health of the API"""
         response = await self.client.get(f"{self.base_url}/api/v1/health")
         response.raise_for_status()
 
-        return response.json()
+        return orjson.loads(response.content)
+
+
+# command -> (handler, message when the text is missing, output prefix)
+COMMANDS: dict[
+    str, tuple[Callable[[OperatorConsoleClient, str], Awaitable[Any]], str | None, str]
+] = {
+    "/chat": (
+        lambda c, text: c.chat_with_embedding(text),
+        "Please provide text to chat.",
+        "💬 Response:\n",
+    ),
+    "/memory": (
+        lambda c, text: c.add_memory(text),
+        "Please provide text to store as memory.",
+        "💾 Memory added: ",
+    ),
+    "/query": (
+        lambda c, text: c.query_similar_memories(text),
+        "Please provide a query.",
+        "🔍 Similar memories: ",
+    ),
+    "/health": (lambda c, _: c.health_check(), None, "🏥 Health status: "),
+}
+
+
+async def read_line(prompt: str) -> str:
+    """
+    input() without blocking the event loop
+
+    Reads on a daemon thread rather than asyncio.to_thread so an exit while
+    the prompt is still waiting doesn't hang on the executor shutdown.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(line: str | None, error: BaseException | None):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(line)
+
+    def read():
+        try:
+            line = input(prompt)
+        except BaseException as e:  # EOFError/KeyboardInterrupt go to the caller
+            loop.call_soon_threadsafe(settle, None, e)
+        else:
+            loop.call_soon_threadsafe(settle, line, None)
+
+    threading.Thread(target=read, daemon=True).start()
+    return await future
 
 
 async def run_operator_console():
@@ -123,55 +223,36 @@ async def run_operator_console():
 
     while True:
         try:
-            line = input("GhostWire> ").strip()
+            line = (await read_line("GhostWire> ")).strip()
             if not line:
                 continue
             if line.lower() in {"/exit", "exit", "quit"}:
                 print("Exiting console.")
                 break
 
-            if line.startswith("/chat "):
-                text = line[len("/chat ") :].strip()
-                if not text:
-                    print("Please provide text to chat.")
-                    continue
-                print("💬 Response:")
-                response = await client.chat_with_embedding(text)
-                print(response)
-
-            elif line.startswith("/memory "):
-                text = line[len("/memory ") :].strip()
-                if not text:
-                    print("Please provide text to store as memory.")
-                    continue
-                result = await client.add_memory(text)
-                print(f"💾 Memory added: {result}")
-
-            elif line.startswith("/query "):
-                text = line[len("/query ") :].strip()
-                if not text:
-                    print("Please provide a query.")
-                    continue
-                result = await client.query_similar_memories(text)
-                print(f"🔍 Similar memories: {result}")
-
-            elif line.startswith("/health"):
-                result = await client.health_check()
-                print(f"🏥 Health status: {result}")
-
-            elif line.startswith("/"):
+            cmd, _, rest = line.partition(" ")
+            if not cmd.startswith("/"):
+                # Default to chat
+                cmd, rest = "/chat", line
+            command = COMMANDS.get(cmd.lower())
+            if command is None:
                 print(f"Unknown command: {line}")
+                continue
 
-            else:
-                # Default to chat
-                print("💬 Response:")
-                response = await client.chat_with_embedding(line)
-                print(response)
+            handler, missing_text, prefix = command
+            text = rest.strip()
+            if missing_text and not text:
+                print(missing_text)
+                continue
+            result = await handler(client, text)
+            print(f"{prefix}{result}")
 
-        except (EOFError, KeyboardInterrupt):
+        except (EOFError, KeyboardInterrupt, asyncio.CancelledError):
+            # Ctrl+C under asyncio.run cancels the pending read_line
             print("\nExiting console.")
             break
 
+    await aclose_shared_client()
     print("🧩 Session closed. The wire grows silent.")
 
 
@@ -4,12 +4,17 @@ Every request must present a bearer token issued by `AuthService`.
 Secrets are kept in `SECRET_KEY` and are signed with the configured algorithm.
 """
 
+import asyncio
+import hashlib
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 
-import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import jwt
 from passlib.context import CryptContext
 
 from ...config.settings import settings
@@ -20,19 +25,30 @@ security = HTTPBearer()
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.JWT_ALGORITHM
 
+# Verified payloads keyed by the token's SHA-256, so raw tokens aren't retained
+TOKEN_CACHE_SIZE = 10_000
+TOKEN_CACHE_TTL = 30.0  # Seconds before a cached token is verified again
+_token_cache: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+_token_cache_lock = threading.Lock()
+
 
 class AuthService:
     """Authentication service for handling user authentication and authorization"""
 
+    # bcrypt releases the GIL while hashing, so worker threads keep these
+    # off the event loop and still spread concurrent logins across cores
+
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
+    async def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a plain password against a hashed password"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return await asyncio.to_thread(
+            pwd_context.verify, plain_password, hashed_password
+        )
 
     @staticmethod
-    def get_password_hash(password: str) -> str:
+    async def get_password_hash(password: str) -> str:
         """Generate a hash for a password"""
-        return pwd_context.hash(password)
+        return await asyncio.to_thread(pwd_context.hash, password)
 
     @staticmethod
     def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
@@ -51,10 +67,30 @@ class AuthService:
 
     @staticmethod
     def verify_token(token: str) -> dict:
-        """Verify a JWT token and return the payload"""
+        """
+        Verify a JWT token and return the payload.
+        Successful verifications are cached until TOKEN_CACHE_TTL elapses or
+        the token expires, whichever comes first; failures are never cached.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with _token_cache_lock:
+            cached = _token_cache.get(key)
+            if cached is not None:
+                payload, valid_until = cached
+                if valid_until > now:
+                    _token_cache.move_to_end(key)
+                    return payload
+                del _token_cache[key]
+
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-            return payload
+            # Missing claims fail inside decode, so there is no second check
+            payload = jwt.decode(
+                token,
+                SECRET_KEY,
+                algorithms=[ALGORITHM],
+                options={"require_exp": True, "require_sub": True},
+            )
         except jwt.ExpiredSignatureError as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -68,21 +104,22 @@ class AuthService:
                 headers={"WWW-Authenticate": "Bearer"},
             ) from e
 
+        valid_until = now + TOKEN_CACHE_TTL
+        if "exp" in payload:
+            valid_until = min(valid_until, float(payload["exp"]))
+        with _token_cache_lock:
+            _token_cache[key] = (payload, valid_until)
+            if len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+        return payload
+
     @staticmethod
     async def get_current_user(
         credentials: HTTPAuthorizationCredentials = Depends(security),
     ) -> str:
         """Get the current user from the token"""
         token = credentials.credentials
-        payload = AuthService.verify_token(token)
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return user_id
+        return AuthService.verify_token(token)["sub"]
 
 
 # Generate API key for demo purposes
@@ -0,0 +1,61 @@
+"""
+# ⚡️ Metrics Middleware
+
+One ASGI layer that times every matched route and counts its calls. Labelled Prometheus children are bound once per route path and reused for every later request.
+"""
+
+import time
+
+from prometheus_client import Counter, Histogram
+
+from ..v1.metrics import api_calls_total, api_latency
+
+
+def route_label(path: str, template: str) -> str:
+    """
+    Full route template for a request path. Routes inside an included router
+    may report their template without the router's prefix (e.g. "/health" for
+    /api/v1/health), so the missing leading segments are taken from the path.
+    """
+    if ":path}" in template:
+        # A path converter spans several segments; the split can't be inferred
+        return template
+    segments = path.split("/")
+    prefix = "/".join(segments[: len(segments) - template.count("/")])
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """Record latency and call counts per route template"""
+
+    def __init__(self, app):
+        self.app = app
+        # (route, path depth) -> (latency histogram child, call counter child)
+        self._children: dict[tuple[int, int], tuple[Histogram, Counter]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # The router stores the matched route in the shared scope
+            route = scope.get("route")
+            template = getattr(route, "path", None)
+            if template is not None:
+                # Same route reached under a different prefix is a separate series
+                key = (id(route), scope["path"].count("/"))
+                children = self._children.get(key)
+                if children is None:
+                    label = route_label(scope["path"], template)
+                    children = (
+                        api_latency.labels(route=label),
+                        api_calls_total.labels(route=label),
+                    )
+                    self._children[key] = children
+                latency, calls = children
+                latency.observe(time.perf_counter() - start)
+                calls.inc()
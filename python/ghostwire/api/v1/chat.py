@@ -19,7 +19,6 @@ from ...utils.security import (
     validate_session_id,
     validate_text_content,
 )
-from .metrics import instrument_route
 
 router = APIRouter()
 
@@ -51,7 +50,6 @@ class ChatResponse(BaseModel):
 
 
 @router.post("/chat_embedding")
-@instrument_route("chat_embedding")
 async def chat_with_embedding(request: ChatEmbeddingRequest):
     """Chat endpoint that uses embeddings for context retrieval"""
     try:
@@ -104,7 +102,6 @@ async def chat_with_embedding(request: ChatEmbeddingRequest):
 
 
 @router.post("/chat_completion")
-@instrument_route("chat_completion")
 async def chat_completion(request: ChatEmbeddingRequest):
     """Simple chat completion without retrieval"""
     try:
@@ -131,7 +128,6 @@ async def chat_completion(request: ChatEmbeddingRequest):
 
 
 @router.post("/memory")
-@instrument_route("memory")
 async def add_memory(request: ChatEmbeddingRequest):
     """Add memory entry to the database"""
     try:
@@ -4,19 +4,67 @@
 Ingestion, search, and listing of document chunks. Every operation validates session credentials, enforces content limits, and records metadata in the vector store.
 """
 
+import hashlib
 import logging
+import time
+from collections import OrderedDict
 
 from fastapi import APIRouter, File, Form, HTTPException, UploadFile
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from ...models.base import APIResponse
 from ...services.document_service import document_service
+from ...services.memory_service import memory_service
 from ...utils.error_handling import handle_exception
 from ...utils.security import validate_session_id, validate_text_content
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Recently ingested uploads: content hash -> (memory IDs, ingested at).
+# Kept per process, so with several workers a repeat only hits on the same one.
+# Hits are checked against the store, since memories can be deleted meanwhile
+INGEST_CACHE_SIZE = 1024
+INGEST_CACHE_TTL = 600.0  # Seconds an upload is recognised as already ingested
+_ingest_cache: OrderedDict[bytes, tuple[list[int], float]] = OrderedDict()
+
+
+def _ingest_key(session_id: str, source: str, content: bytes) -> bytes:
+    """Hash an upload together with where it is stored"""
+    digest = hashlib.blake2b(digest_size=32)
+    for part in (session_id.encode(), source.encode(), content):
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.digest()
+
+
+def _cached_ingest(key: bytes) -> list[int] | None:
+    """Memory IDs from an identical recent ingest, if all are still stored"""
+    cached = _ingest_cache.get(key)
+    if cached is None:
+        return None
+    memory_ids, ingested_at = cached
+    # IDs are never reused, so any missing one means the ingest was deleted
+    if time.monotonic() - ingested_at > INGEST_CACHE_TTL or not (
+        memory_service.memories_exist(memory_ids)
+    ):
+        del _ingest_cache[key]
+        return None
+    return memory_ids
+
+
+def _remember_ingest(key: bytes, memory_ids: list[int], total_chunks: int):
+    """
+    Record an ingest so an identical upload can reuse it. Only complete ingests
+    are kept, so a retry can fill in chunks that failed to embed or store.
+    """
+    if not memory_ids or len(memory_ids) != total_chunks:
+        return
+    _ingest_cache[key] = (memory_ids, time.monotonic())
+    _ingest_cache.move_to_end(key)
+    if len(_ingest_cache) > INGEST_CACHE_SIZE:
+        _ingest_cache.popitem(last=False)
+
 
 class IngestDocumentRequest(BaseModel):
     """Request model for document ingestion"""
@@ -25,6 +73,7 @@ class IngestDocumentRequest(BaseModel):
     content: str
     source: str
     document_id: str | None = None
+    embedding_batch_size: int = Field(default=16, ge=1, le=256)
 
 
 class SearchDocumentsRequest(BaseModel):
@@ -73,13 +122,23 @@ async def ingest_document(request: IngestDocumentRequest):
         if not request.source or len(request.source) > 200:
             raise HTTPException(status_code=422, detail="Invalid source specified")
 
+        # Skip re-chunking and re-embedding an upload that was just ingested
+        key = _ingest_key(request.session_id, request.source, request.content.encode())
+        memory_ids = _cached_ingest(key)
+        if memory_ids is not None:
+            return APIResponse(
+                message=f"Document already ingested. Reused {len(memory_ids)} chunks with IDs: {memory_ids}"
+            )
+
         # Process the document ingestion
-        memory_ids = await document_service.ingest_document(
+        memory_ids, total_chunks = await document_service.ingest_document_with_total(
             content=request.content,
             source=request.source,
             session_id=request.session_id,
             document_id=request.document_id,
+            batch_size=request.embedding_batch_size,
         )
+        _remember_ingest(key, memory_ids, total_chunks)
 
         return APIResponse(
             message=f"Successfully ingested document. Created {len(memory_ids)} chunks with IDs: {memory_ids}"
@@ -93,7 +152,10 @@ async def ingest_document(request: IngestDocumentRequest):
 
 @router.post("/documents/ingest_file", response_model=APIResponse)
 async def ingest_document_from_file(
-    session_id: str = Form(...), source: str = Form(...), file: UploadFile = File(...)
+    session_id: str = Form(...),
+    source: str = Form(...),
+    file: UploadFile = File(...),
+    embedding_batch_size: int = Form(16, ge=1, le=256),
 ):
     """Ingest a document from file upload"""
     try:
@@ -111,10 +173,22 @@ async def ingest_document_from_file(
         # Validate content
         validate_text_content(content_str, max_length=50000)  # Allow larger documents
 
+        # Same check for file uploads, on the raw bytes
+        key = _ingest_key(session_id, source, content)
+        memory_ids = _cached_ingest(key)
+        if memory_ids is not None:
+            return APIResponse(
+                message=f"Document {file.filename} already ingested. Reused {len(memory_ids)} chunks with IDs: {memory_ids}"
+            )
+
         # Process the document ingestion
-        memory_ids = await document_service.ingest_document(
-            content=content_str, source=source, session_id=session_id
+        memory_ids, total_chunks = await document_service.ingest_document_with_total(
+            content=content_str,
+            source=source,
+            session_id=session_id,
+            batch_size=embedding_batch_size,
         )
+        _remember_ingest(key, memory_ids, total_chunks)
 
         return APIResponse(
             message=f"Successfully ingested document {file.filename}. Created {len(memory_ids)} chunks with IDs: {memory_ids}"
@@ -12,13 +12,11 @@ from ...models.embedding import EmbeddingRequest, EmbeddingResponse
 from ...services.embedding_service import embedding_service
 from ...utils.error_handling import handle_exception
 from ...utils.security import validate_text_content
-from .metrics import instrument_route
 
 router = APIRouter()
 
 
 @router.post("/embeddings", response_model=EmbeddingResponse)
-@instrument_route("embeddings")
 async def create_embeddings(request: EmbeddingRequest):
     """Create embeddings for input text(s)"""
     try:
@@ -43,7 +41,6 @@ async def create_embeddings(request: EmbeddingRequest):
 
 
 @router.get("/models")
-@instrument_route("models")
 async def list_models() -> dict[str, Any]:
     """List available models"""
     # This would integrate with Ollama to list models
@@ -7,8 +7,6 @@ A silent pulse that confirms GhostWire is alive. The `/health` route returns the
 from fastapi import APIRouter
 from pydantic import BaseModel
 
-from .metrics import instrument_route
-
 
 class HealthResponse(BaseModel):
     status: str
@@ -19,13 +17,7 @@ class HealthResponse(BaseModel):
 router = APIRouter()
 
 
-@instrument_route("health")
+@router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Basic health check endpoint"""
     return HealthResponse(status="ok")
-
-
-# Register the instrumented route
-router.add_api_route(
-    "/health", health_check, methods=["GET"], response_model=HealthResponse
-)
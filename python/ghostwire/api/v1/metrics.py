@@ -1,10 +1,18 @@
 # The prometheus_client library is required for metrics collection.
 # It is listed as a runtime dependency in pyproject.toml.
 
-from fastapi import APIRouter, Response
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+import os
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    make_asgi_app,
+    multiprocess,
+)
 
-# Histogram per route (example)
+# Histogram per route, recorded by MetricsMiddleware
 api_latency = Histogram(
     "api_server_latency_seconds", "Latency of API routes", labelnames=["route"]
 )
@@ -18,24 +26,25 @@ api_calls_total = Counter(
 process_cpu_usage = Counter("process_cpu_usage_seconds", "Process CPU usage time")
 
 
-# Decorator to wrap route handlers
-def instrument_route(route_name: str):
-    def decorator(func):
-        async def wrapper(*args, **kwargs):
-            with api_latency.labels(route=route_name).time():
-                api_calls_total.labels(route=route_name).inc()
-                return await func(*args, **kwargs)
-
-        return wrapper
-
-    return decorator
+def metrics_registry() -> CollectorRegistry:
+    """Registry to scrape: the default one, or all workers' in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    # Each worker writes its samples to this directory; merge them all,
+    # otherwise a scrape only sees whichever worker answered it
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
 
 
-# Create router for metrics endpoint
-metrics_router = APIRouter()
+class MetricsApp:
+    """
+    Plain ASGI app for the scrape endpoint. Routed as-is, so scrapes skip
+    FastAPI's dependency and response handling.
+    """
 
+    def __init__(self, registry: CollectorRegistry | None = None):
+        self._app = make_asgi_app(registry=registry or metrics_registry())
 
-@metrics_router.get("/metrics")
-async def metrics():
-    """Expose Prometheus metrics"""
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    async def __call__(self, scope, receive, send):
+        await self._app(scope, receive, send)
@@ -117,6 +117,7 @@ class Settings(BaseSettings):
     SECRET_KEY: str = Field(
         default="your-secret-key-here", description="Secret key for security"
     )
+    # HS256 verifies with a single HMAC, cheaper than any asymmetric algorithm
     JWT_ALGORITHM: str = Field(
         default="HS256", description="Algorithm for JWT encoding"
     )
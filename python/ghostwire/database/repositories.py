@@ -108,42 +108,41 @@ class MemoryRepository:
             )
 
             rows = cursor.fetchall()
-            target_vec = np.array(embedding, dtype=np.float32)
-
-            # Calculate cosine similarity with all stored embeddings
-            scored_memories = []
-            for row in rows:
-                stored_embedding = np.frombuffer(row["embedding"], dtype=np.float32)
-
-                # Calculate cosine similarity
-                dot_product = np.dot(target_vec, stored_embedding)
-                norm_product = np.linalg.norm(target_vec) * np.linalg.norm(
-                    stored_embedding
+            target_vec = np.asarray(embedding, dtype=np.float32)
+
+            # Skip rows whose stored vector doesn't match the query dimension
+            nbytes = target_vec.nbytes
+            rows = [row for row in rows if len(row["embedding"]) == nbytes]
+            if not rows:
+                return []
+
+            # Score every stored embedding at once: one (N, D) matrix, one matvec
+            matrix = np.frombuffer(
+                b"".join(row["embedding"] for row in rows), dtype=np.float32
+            ).reshape(len(rows), -1)
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(target_vec)
+            # Add small epsilon to avoid division by zero
+            similarities = (matrix @ target_vec) / (norms + 1e-8)
+
+            # Select the top 'limit' in O(N), then sort only those descending
+            scores = -similarities
+            if 0 < limit < len(rows):
+                top = np.argpartition(scores, limit - 1)[:limit]
+                order = top[np.argsort(scores[top], kind="stable")]
+            else:
+                order = np.argsort(scores, kind="stable")[: max(limit, 0)]
+            return [
+                Memory(
+                    id=rows[i]["id"],
+                    session_id=rows[i]["session_id"],
+                    prompt_text=rows[i]["prompt_text"],
+                    answer_text=rows[i]["answer_text"],
+                    timestamp=rows[i]["timestamp"],
+                    embedding=rows[i]["embedding"],
+                    summary_text=rows[i]["summary_text"],
                 )
-                similarity = dot_product / (
-                    norm_product + 1e-8
-                )  # Add small epsilon to avoid division by zero
-
-                scored_memories.append(
-                    (
-                        similarity,
-                        Memory(
-                            id=row["id"],
-                            session_id=row["session_id"],
-                            prompt_text=row["prompt_text"],
-                            answer_text=row["answer_text"],
-                            timestamp=row["timestamp"],
-                            embedding=row["embedding"],
-                            summary_text=row["summary_text"],
-                        ),
-                    )
-                )
-
-            # Sort by similarity in descending order
-            scored_memories.sort(key=lambda x: x[0], reverse=True)
-
-            # Return top 'limit' results
-            return [memory for _, memory in scored_memories[:limit]]
+                for i in order
+            ]
 
     @staticmethod
     def delete_collection(collection_name: str) -> bool:
@@ -188,3 +187,14 @@ class MemoryRepository:
                 (collection_name,),
             )
             return cursor.fetchone()["count"]
+
+    @staticmethod
+    def count_existing(memory_ids: list[int]) -> int:
+        """Count how many of the given memory IDs are still stored"""
+        with get_db_connection() as conn:
+            placeholders = ",".join("?" * len(memory_ids))
+            cursor = conn.execute(
+                f"SELECT COUNT(*) as count FROM memory_text WHERE id IN ({placeholders})",
+                memory_ids,
+            )
+            return cursor.fetchone()["count"]
@@ -10,7 +10,9 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .api.middleware.metrics import MetricsMiddleware
 from .api.middleware.rate_limit import RateLimitMiddleware
+from .api.v1.metrics import MetricsApp
 from .api.v1.router import api_router
 from .config.settings import settings
 from .database.connection import close_db_pool
@@ -28,6 +30,9 @@ def create_app() -> FastAPI:
         redoc_url="/redoc",
     )
 
+    # Route metrics; added first so it is innermost and times only the route
+    app.add_middleware(MetricsMiddleware)
+
     # Add CORS middleware with proper security settings
     app.add_middleware(
         CORSMiddleware,
@@ -42,6 +47,9 @@ def create_app() -> FastAPI:
     # Add rate limiting middleware
     app.add_middleware(RateLimitMiddleware)
 
+    # Prometheus scrape endpoint, served by prometheus_client directly
+    app.add_route("/api/v1/metrics", MetricsApp(), include_in_schema=False)
+
     # Include API routes
     app.include_router(api_router, prefix="/api/v1")
 
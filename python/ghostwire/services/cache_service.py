@@ -78,13 +78,13 @@ class CacheService:
         return hashlib.sha256(content.encode()).hexdigest()
 
     def _calculate_similarity(
-        self, embedding1: list[float], embedding2: list[float]
+        self, embedding1: list[float] | np.ndarray, embedding2: list[float] | np.ndarray
     ) -> float:
         """
         Calculate cosine similarity between two embeddings
         """
-        vec1 = np.array(embedding1, dtype=np.float32)
-        vec2 = np.array(embedding2, dtype=np.float32)
+        vec1 = np.asarray(embedding1, dtype=np.float32)
+        vec2 = np.asarray(embedding2, dtype=np.float32)
 
         # Calculate cosine similarity
         dot_product = np.dot(vec1, vec2)
@@ -144,20 +144,34 @@ class CacheService:
 
                 rows = cursor.fetchall()
 
-                for row in rows:
-                    stored_embedding_bytes = row[1]
-                    stored_embedding = np.frombuffer(
-                        stored_embedding_bytes, dtype=np.float32
-                    ).tolist()
-
-                    similarity = self._calculate_similarity(
-                        query_embedding, stored_embedding
+                # Keep embeddings as float32 bytes end to end: one (N, D) matrix,
+                # one matvec, no per-row float-list round trips
+                query_vec = np.asarray(query_embedding, dtype=np.float32)
+                rows = [row for row in rows if len(row[1]) == query_vec.nbytes]
+                if rows:
+                    matrix = np.frombuffer(
+                        b"".join(row[1] for row in rows), dtype=np.float32
+                    ).reshape(len(rows), -1)
+                    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vec)
+                    dots = matrix @ query_vec
+                    similarities = np.divide(
+                        dots, norms, out=np.zeros_like(dots), where=norms != 0
                     )
 
                     # Use the stored threshold or default to the parameter
-                    threshold = row[4] if row[4] is not None else similarity_threshold
+                    thresholds = np.array(
+                        [
+                            row[4] if row[4] is not None else similarity_threshold
+                            for row in rows
+                        ],
+                        dtype=np.float32,
+                    )
+                    hits = np.flatnonzero(similarities >= thresholds)
 
-                    if similarity >= threshold:
+                    if hits.size:
+                        # Rows are newest first; keep the most recent match
+                        row = rows[hits[0]]
+                        similarity = float(similarities[hits[0]])
                         self.logger.info(
                             f"Cache HIT: Similar match found (similarity: {similarity:.3f}) "
                             f"for session {session_id}"
@@ -132,10 +132,33 @@ class DocumentService:
         }
 
     async def ingest_document(
-        self, content: str, source: str, session_id: str, document_id: str | None = None
+        self,
+        content: str,
+        source: str,
+        session_id: str,
+        document_id: str | None = None,
+        batch_size: int = 16,
     ) -> list[int]:
         """
-        Ingest a document and store chunks in memory
+        Ingest a document and store chunks in memory, embedding up to
+        batch_size chunks per embedding request
+        """
+        memory_ids, _ = await self.ingest_document_with_total(
+            content, source, session_id, document_id, batch_size
+        )
+        return memory_ids
+
+    async def ingest_document_with_total(
+        self,
+        content: str,
+        source: str,
+        session_id: str,
+        document_id: str | None = None,
+        batch_size: int = 16,
+    ) -> tuple[list[int], int]:
+        """
+        Ingest a document like ingest_document, also returning how many chunks
+        it produced; fewer stored IDs than chunks means some were skipped
         """
         try:
             # Generate document ID if not provided
@@ -156,49 +179,53 @@ class DocumentService:
             chunks = self.chunker.chunk_text(parsed_content, source)
             stored_memory_ids = []
 
-            # Process each chunk
-            for i, chunk in enumerate(chunks):
-                chunk_content = chunk["content"]
-
-                # Create memory entry for this chunk
-                memory_create = MemoryCreate(
-                    session_id=session_id,
-                    prompt_text=chunk_content,  # Store the chunk as prompt_text
-                    answer_text=f"Document chunk from {source}",  # Context about the document
-                    embedding=[],  # Will be filled in below
-                    summary_text=f"Document: {source}, Chunk: {i + 1}/{len(chunks)}",
-                )
-
-                # Generate embedding for the chunk content
+            # Embed the chunks in batches, then store them in order
+            for start in range(0, len(chunks), batch_size):
+                batch = chunks[start : start + batch_size]
                 try:
-                    embedding = await embedding_service.embed_text(chunk_content)
+                    embeddings = await embedding_service.embed_texts(
+                        [chunk["content"] for chunk in batch]
+                    )
+                except Exception as e:
+                    self.logger.error(
+                        f"Error generating embeddings for chunks "
+                        f"{start + 1}-{start + len(batch)}: {e}"
+                    )
+                    continue
+
+                for i, (chunk, embedding) in enumerate(
+                    zip(batch, embeddings, strict=True), start
+                ):
                     if not embedding:
                         self.logger.warning(
                             f"Failed to generate embedding for chunk {i + 1}, skipping"
                         )
                         continue
-                    memory_create.embedding = embedding
-                except Exception as e:
-                    self.logger.error(
-                        f"Error generating embedding for chunk {i + 1}: {e}"
-                    )
-                    continue
 
-                # Store in memory service
-                try:
-                    memory = memory_service.create_memory(memory_create)
-                    stored_memory_ids.append(memory.id)
-                    self.logger.info(f"Stored chunk {i + 1} as memory {memory.id}")
-                except Exception as e:
-                    self.logger.error(
-                        f"Error storing chunk {i + 1} in memory service: {e}"
+                    # Create memory entry for this chunk
+                    memory_create = MemoryCreate(
+                        session_id=session_id,
+                        prompt_text=chunk["content"],  # Store the chunk as prompt_text
+                        answer_text=f"Document chunk from {source}",  # Context about the document
+                        embedding=embedding,
+                        summary_text=f"Document: {source}, Chunk: {i + 1}/{len(chunks)}",
                     )
-                    continue
+
+                    # Store in memory service
+                    try:
+                        memory = memory_service.create_memory(memory_create)
+                        stored_memory_ids.append(memory.id)
+                        self.logger.info(f"Stored chunk {i + 1} as memory {memory.id}")
+                    except Exception as e:
+                        self.logger.error(
+                            f"Error storing chunk {i + 1} in memory service: {e}"
+                        )
+                        continue
 
             self.logger.info(
                 f"Successfully ingested document {document_id} as {len(stored_memory_ids)} chunks"
             )
-            return stored_memory_ids
+            return stored_memory_ids, len(chunks)
 
         except Exception as e:
             self.logger.error(f"Error ingesting document: {e}")
@@ -176,6 +176,40 @@ class EmbeddingService:
 
         return embedding or [0.0] * settings.EMBED_DIM
 
+    async def embed_texts(
+        self, texts: list[str], model: str = None
+    ) -> list[list[float]]:
+        """
+        Embed several texts with one /api/embed request, falling back to
+        embed_text per text if the batch call fails or comes back incomplete
+        """
+        if not texts:
+            return []
+
+        model_to_use = model or self._cached_embed_model or settings.EMBED_MODELS[0]
+        try:
+            response = await self.client.post(
+                f"{settings.LOCAL_OLLAMA_URL}/api/embed",
+                json={"model": model_to_use, "input": texts},
+            )
+            response.raise_for_status()
+            embeddings = response.json().get("embeddings")
+            if (
+                isinstance(embeddings, list)
+                and len(embeddings) == len(texts)
+                and all(embeddings)
+            ):
+                if not model:
+                    self._cached_embed_model = model_to_use
+                return embeddings
+        except Exception as e:
+            self.logger.warning(
+                f"Failed to batch {len(texts)} embeddings via /api/embed "
+                f"for model {model_to_use}: {e}"
+            )
+
+        return [await self.embed_text(text, model) for text in texts]
+
 
 class SummarizationService:
     """Service class for text summarization"""
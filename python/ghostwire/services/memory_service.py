@@ -191,6 +191,10 @@ class MemoryService:
         """Delete all memories in a collection"""
         return self.repository.delete_collection(collection_name)
 
+    def memories_exist(self, memory_ids: list[int]) -> bool:
+        """Check that every given memory ID is still stored"""
+        return self.repository.count_existing(memory_ids) == len(memory_ids)
+
     def collection_exists(self, collection_name: str) -> bool:
         """Check if a collection exists"""
         return self.repository.collection_exists(collection_name)
@@ -0,0 +1,37 @@
+"""
+Shared HTTP client for GhostWire Refractory tools
+"""
+
+import importlib.util
+
+import httpx
+
+# Keep-alive pool shared by the benchmark clients and the operator console
+SHARED_CLIENT_LIMITS = httpx.Limits(
+    max_keepalive_connections=20, max_connections=100, keepalive_expiry=30.0
+)
+# HTTP/2 needs the optional h2 package; without it httpx stays on HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+_shared_client: httpx.AsyncClient | None = None
+
+
+def get_shared_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide AsyncClient, creating it on first use
+    (or again after aclose_shared_client)
+    """
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = httpx.AsyncClient(
+            timeout=60.0, limits=SHARED_CLIENT_LIMITS, http2=HTTP2_AVAILABLE
+        )
+    return _shared_client
+
+
+async def aclose_shared_client():
+    """Close the process-wide AsyncClient if one was created"""
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
@@ -0,0 +1,17 @@
+"""
+Process memory sampling for GhostWire Refractory benchmarks
+"""
+
+import psutil
+
+_process = psutil.Process()
+
+
+def rss_gb() -> float:
+    """
+    Current resident set size of this process in GB, from one read of its
+    memory stats. Unlike ru_maxrss it falls as well as rises, so before/after
+    samples give a real delta. Only this process is measured, not a
+    controller running on the same host.
+    """
+    return _process.memory_info().rss / 1024**3
@@ -2,7 +2,16 @@
 Vector utilities for GhostWire Refractory
 """
 
+import logging
+from collections.abc import Iterable
+
 import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Above this many rows the N x N similarity matrix is not materialized
+PAIRWISE_GRAM_MAX_ROWS = 512
 
 
 def normalize_vector(vector: np.ndarray) -> np.ndarray:
@@ -13,3 +22,65 @@ def normalize_vector(vector: np.ndarray) -> np.ndarray:
     if norm == 0:
         return vector
     return vector / norm
+
+
+def mean_pairwise_cosine(vectors: list[np.ndarray] | np.ndarray) -> float:
+    """
+    Mean cosine similarity over all distinct pairs of vectors
+
+    Accepts a list of vectors or a 2D array of rows (used as-is, not modified).
+    All pairs are scored with a single matrix product, scaled by the row norms.
+    For more than PAIRWISE_GRAM_MAX_ROWS rows the pair sum is taken from the
+    sum of the unit rows instead, since |sum u_i|^2 = N + 2 * sum_{i<j} u_i.u_j,
+    which needs O(N * D) work and no N x N matrix.
+    Returns 1.0 (perfectly stable) for fewer than two vectors.
+    """
+    if len(vectors) < 2:
+        return 1.0
+    matrix = np.asarray(vectors, dtype=np.float32)
+    row_norms = np.linalg.norm(matrix, axis=1)
+    norms = row_norms + 1e-12
+    n = len(matrix)
+    if n > PAIRWISE_GRAM_MAX_ROWS:
+        unit_sum = (matrix / norms[:, None]).sum(axis=0, dtype=np.float64)
+        # Subtract the diagonal (1 per row, 0 for all-zero rows)
+        self_similarity = np.square(row_norms / norms, dtype=np.float64).sum()
+        pair_sum = (unit_sum @ unit_sum - self_similarity) / 2
+        return float(pair_sum / (n * (n - 1) / 2))
+    # Scale the Gram matrix in place and average the off-diagonal half via the
+    # full sum; this avoids N x N temporaries and pair index arrays
+    similarities = matrix @ matrix.T
+    similarities /= norms[:, None]
+    similarities /= norms[None, :]
+    off_diagonal = similarities.sum(dtype=np.float64) - np.trace(
+        similarities, dtype=np.float64
+    )
+    return float(off_diagonal / (n * (n - 1)))
+
+
+def embedding_stability(bodies: Iterable[bytes], limit: int) -> tuple[float, int]:
+    """
+    Stability of the embeddings in OpenAI-style embedding response bodies
+
+    Up to `limit` non-empty embeddings are copied into one float32 matrix,
+    preallocated on the first one, and scored with mean_pairwise_cosine.
+    Bodies that can't be parsed are logged and skipped.
+    Returns (stability, number of embeddings used).
+    """
+    embeddings = None
+    n_valid = 0
+    for body in bodies:
+        try:
+            for item in orjson.loads(body).get("data", []):
+                embedding = item.get("embedding")
+                if not embedding or n_valid == limit:
+                    continue
+                if embeddings is None:
+                    embeddings = np.empty((limit, len(embedding)), dtype=np.float32)
+                embeddings[n_valid] = embedding
+                n_valid += 1
+        except (ValueError, TypeError, AttributeError) as e:
+            logger.warning("Skipping unusable embedding response: %s", e)
+    if n_valid < 2:
+        return 1.0, n_valid
+    return mean_pairwise_cosine(embeddings[:n_valid]), n_valid
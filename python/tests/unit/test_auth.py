@@ -0,0 +1,148 @@
+"""
+Unit tests for GhostWire Refractory - Authentication
+
+Tests JWT verification in AuthService.
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from ghostwire.api.middleware import auth
+from ghostwire.api.middleware.auth import AuthService
+from jose import jwt
+
+
+def make_token(**claims) -> str:
+    """Sign claims with the configured key and algorithm"""
+    return jwt.encode(claims, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+
+class TestVerifyToken:
+    """Test suite for AuthService.verify_token and get_current_user."""
+
+    def setup_method(self):
+        """Setup method to start each test with an empty token cache"""
+        auth._token_cache.clear()
+
+    def test_valid_token_returns_payload(self):
+        """Test that a signed token with sub and exp is accepted."""
+        token = AuthService.create_access_token({"sub": "alice"})
+
+        assert AuthService.verify_token(token)["sub"] == "alice"
+
+    async def test_current_user_from_token(self):
+        """Test that get_current_user returns the token's subject."""
+        token = AuthService.create_access_token({"sub": "alice"})
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        assert await AuthService.get_current_user(credentials) == "alice"
+
+    @pytest.mark.parametrize(
+        "claims",
+        [{"exp": int(time.time()) + 60}, {"sub": "alice"}],
+        ids=["missing-sub", "missing-exp"],
+    )
+    async def test_missing_claim_rejected(self, claims):
+        """Test that a token without sub or exp gets a 401, not a 500."""
+        credentials = HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials=make_token(**claims)
+        )
+
+        with pytest.raises(HTTPException) as exc_info:
+            await AuthService.get_current_user(credentials)
+
+        assert exc_info.value.status_code == 401
+
+    def test_expired_token_rejected(self):
+        """Test that an expired token gets a 401 saying so."""
+        token = make_token(sub="alice", exp=int(time.time()) - 60)
+
+        with pytest.raises(HTTPException) as exc_info:
+            AuthService.verify_token(token)
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Token has expired"
+
+    def test_bad_signature_rejected(self):
+        """Test that a token signed with another key gets a 401."""
+        token = jwt.encode(
+            {"sub": "alice", "exp": int(time.time()) + 60},
+            "not-the-secret",
+            algorithm=auth.ALGORITHM,
+        )
+
+        with pytest.raises(HTTPException) as exc_info:
+            AuthService.verify_token(token)
+
+        assert exc_info.value.status_code == 401
+
+
+@patch("ghostwire.api.middleware.auth.time.time")
+@patch("ghostwire.api.middleware.auth.jwt.decode")
+class TestTokenCache:
+    """Test suite for the verified-token cache in AuthService.verify_token."""
+
+    def setup_method(self):
+        """Setup method to start each test with an empty token cache"""
+        auth._token_cache.clear()
+
+    def test_repeat_verify_hits_cache(self, mock_decode, mock_time):
+        """Test that a second verify of the same token skips decoding."""
+        mock_decode.return_value = {"sub": "alice", "exp": 5000}
+        mock_time.return_value = 1000.0
+
+        first = AuthService.verify_token("token")
+        second = AuthService.verify_token("token")
+
+        assert first == second == {"sub": "alice", "exp": 5000}
+        assert mock_decode.call_count == 1
+
+    @pytest.mark.parametrize(
+        "exp, valid_until",
+        [(5000, 1000.0 + auth.TOKEN_CACHE_TTL), (1010, 1010.0)],
+        ids=["ttl-first", "exp-first"],
+    )
+    def test_cached_until_ttl_or_exp(self, mock_decode, mock_time, exp, valid_until):
+        """Test that a cached token is reverified at min(now + TTL, exp)."""
+        mock_decode.return_value = {"sub": "alice", "exp": exp}
+        mock_time.return_value = 1000.0
+        AuthService.verify_token("token")
+
+        mock_time.return_value = valid_until - 1
+        AuthService.verify_token("token")
+        assert mock_decode.call_count == 1
+
+        mock_time.return_value = valid_until
+        AuthService.verify_token("token")
+        assert mock_decode.call_count == 2
+
+    def test_invalid_token_not_cached(self, mock_decode, mock_time):
+        """Test that a rejected token is decoded again on every attempt."""
+        mock_decode.side_effect = jwt.JWTError("bad token")
+        mock_time.return_value = 1000.0
+
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                AuthService.verify_token("token")
+
+        assert mock_decode.call_count == 2
+        assert len(auth._token_cache) == 0
+
+    @patch("ghostwire.api.middleware.auth.TOKEN_CACHE_SIZE", 2)
+    def test_least_recently_used_evicted(self, mock_decode, mock_time):
+        """Test that the least recently verified token is evicted when full."""
+        mock_decode.return_value = {"sub": "alice", "exp": 5000}
+        mock_time.return_value = 1000.0
+
+        for token in ("a", "b", "a", "c"):  # "a" is reused, so "b" is oldest
+            AuthService.verify_token(token)
+        assert mock_decode.call_count == 3
+
+        AuthService.verify_token("a")
+        assert mock_decode.call_count == 3
+        AuthService.verify_token("b")
+        assert mock_decode.call_count == 4
+        assert len(auth._token_cache) == 2
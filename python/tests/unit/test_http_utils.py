@@ -0,0 +1,51 @@
+"""
+Unit tests for GhostWire Refractory - HTTP Utilities
+
+Tests the lifecycle of the process-wide shared HTTP client.
+"""
+
+from ghostwire.utils.http import aclose_shared_client, get_shared_client
+
+
+class TestSharedClient:
+    """Test suite for get_shared_client and aclose_shared_client."""
+
+    async def test_returns_same_client(self):
+        """Test that repeated calls reuse one client and its pool."""
+        try:
+            assert get_shared_client() is get_shared_client()
+        finally:
+            await aclose_shared_client()
+
+    async def test_recreated_after_close(self):
+        """Test that a closed shared client is replaced on next use."""
+        first = get_shared_client()
+        await aclose_shared_client()
+
+        second = get_shared_client()
+        try:
+            assert first.is_closed
+            assert second is not first
+            assert not second.is_closed
+        finally:
+            await aclose_shared_client()
+
+    async def test_close_without_client_is_noop(self):
+        """Test that closing before any client exists does nothing."""
+        await aclose_shared_client()
+        await aclose_shared_client()
+
+    async def test_closing_one_benchmark_leaves_others_usable(self):
+        """Test that one instance's aclose doesn't strand another instance"""
+        from benchmarks.rag_benchmarks import RAGBenchmark
+        from benchmarks.summarization_benchmarks import SummarizationBenchmark
+
+        summarization = SummarizationBenchmark()
+        try:
+            async with RAGBenchmark():
+                pass
+
+            assert not summarization.client.is_closed
+            assert summarization.client is get_shared_client()
+        finally:
+            await summarization.aclose()
@@ -0,0 +1,28 @@
+"""
+Unit tests for GhostWire Refractory - Process Memory Utilities
+
+Tests that rss_gb reports current, not peak, resident memory.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from ghostwire.utils import process_memory
+from ghostwire.utils.process_memory import rss_gb
+
+
+class TestRssGb:
+    """Test suite for rss_gb."""
+
+    def test_reports_current_rss(self):
+        """Test that each call reports the RSS at that moment, in GB."""
+        samples = [SimpleNamespace(rss=rss * 1024**3) for rss in (1.0, 3.0, 2.0)]
+
+        with patch.object(
+            process_memory._process, "memory_info", side_effect=samples
+        ) as mock_memory_info:
+            readings = [rss_gb() for _ in samples]
+
+        # A high-water mark would have stayed at 3.0 for the last reading
+        assert readings == [1.0, 3.0, 2.0]
+        assert mock_memory_info.call_count == 3
@@ -50,3 +50,36 @@ def test_metrics_endpoint_content_type():
     assert response.status_code == 200
     assert "text/plain" in response.headers["content-type"]
     assert "charset=utf-8" in response.headers["content-type"]
+
+
+def test_prefixed_routes_get_separate_series():
+    """Test that /health and /api/v1/health are labelled with their full paths"""
+
+    def calls(content: str, route: str) -> float:
+        prefix = f'api_server_calls_total{{route="{route}"}} '
+        for line in content.splitlines():
+            if line.startswith(prefix):
+                return float(line[len(prefix) :])
+        return 0.0
+
+    before = client.get("/api/v1/metrics").content.decode()
+    assert client.get("/health").status_code == 200
+    assert client.get("/api/v1/health").status_code == 200
+    assert client.get("/api/v1/health").status_code == 200
+    after = client.get("/api/v1/metrics").content.decode()
+
+    assert calls(after, "/health") - calls(before, "/health") == 1
+    assert calls(after, "/api/v1/health") - calls(before, "/api/v1/health") == 2
+
+
+def test_route_label_restores_router_prefix():
+    """Test that route_label rebuilds the full template for prefixed routes"""
+    from ghostwire.api.middleware.metrics import route_label
+
+    assert route_label("/health", "/health") == "/health"
+    assert route_label("/api/v1/health", "/health") == "/api/v1/health"
+    assert route_label("/api/v1/health", "/api/v1/health") == "/api/v1/health"
+    assert (
+        route_label("/api/v1/documents/session/abc", "/documents/session/{session_id}")
+        == "/api/v1/documents/session/{session_id}"
+    )
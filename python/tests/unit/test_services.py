@@ -7,7 +7,7 @@ import sys
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
 
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from python.ghostwire.models.memory import MemoryCreate
 from python.ghostwire.services.memory_service import MemoryService
@@ -92,3 +92,164 @@ class TestMemoryService:
 
         # Verify that DB fallback was used (since HNSW count was 0)
         mock_query_db.assert_called_once()
+
+
+class TestDocumentService:
+    def setup_method(self):
+        """Setup method to create a document service instance for each test"""
+        from python.ghostwire.services.document_service import DocumentService
+
+        self.service = DocumentService()
+
+    @patch("python.ghostwire.services.document_service.memory_service")
+    @patch("python.ghostwire.services.document_service.embedding_service")
+    async def test_ingest_document_batches_embeddings(
+        self, mock_embedding_service, mock_memory_service
+    ):
+        """Test that chunks are embedded batch_size at a time and stored in order"""
+        chunks = [
+            {"content": f"chunk {i}", "position": 0, "source": "notes"}
+            for i in range(5)
+        ]
+        self.service.chunker.chunk_text = MagicMock(return_value=chunks)
+        mock_embedding_service.embed_texts = AsyncMock(
+            side_effect=lambda texts: [[0.1] * 768 for _ in texts]
+        )
+        mock_memory_service.create_memory = MagicMock(
+            side_effect=[MagicMock(id=i) for i in range(1, 6)]
+        )
+
+        memory_ids = await self.service.ingest_document(
+            content="ignored", source="notes", session_id="test_session", batch_size=2
+        )
+
+        assert memory_ids == [1, 2, 3, 4, 5]
+        batches = [
+            call.args[0] for call in mock_embedding_service.embed_texts.call_args_list
+        ]
+        assert batches == [
+            ["chunk 0", "chunk 1"],
+            ["chunk 2", "chunk 3"],
+            ["chunk 4"],
+        ]
+        stored = [
+            call.args[0].prompt_text
+            for call in mock_memory_service.create_memory.call_args_list
+        ]
+        assert stored == [chunk["content"] for chunk in chunks]
+
+
+class TestDocumentIngestCache:
+    def setup_method(self):
+        """Setup method to start each test with an empty ingest cache"""
+        from python.ghostwire.api.v1 import documents
+
+        self.documents = documents
+        documents._ingest_cache.clear()
+
+        # Memory IDs currently in the store, shared by every ingest and delete
+        self.stored_ids = set()
+        self.memory_service = MagicMock()
+        self.memory_service.memories_exist.side_effect = self.stored_ids.issuperset
+        self.memory_service.delete_collection.side_effect = lambda _: (
+            self.stored_ids.clear() or True
+        )
+        self.memory_service_patcher = patch(
+            "python.ghostwire.api.v1.documents.memory_service", self.memory_service
+        )
+        self.memory_service_patcher.start()
+
+    def teardown_method(self):
+        """Teardown method to restore the real memory service"""
+        self.memory_service_patcher.stop()
+
+    def _ingests(self, *results):
+        """Ingest mock that stores the IDs of each result in turn"""
+
+        async def ingest(**_):
+            memory_ids, total_chunks = results[min(ingest.calls, len(results) - 1)]
+            ingest.calls += 1
+            self.stored_ids.update(memory_ids)
+            return memory_ids, total_chunks
+
+        ingest.calls = 0
+        return AsyncMock(side_effect=ingest)
+
+    def _request(self, content: str = "Hello there. This is a document."):
+        return self.documents.IngestDocumentRequest(
+            session_id="test_session", content=content, source="notes.txt"
+        )
+
+    @patch("python.ghostwire.api.v1.documents.document_service")
+    async def test_repeat_upload_reuses_ingest(self, mock_document_service):
+        """Test that an identical upload returns the cached memory IDs"""
+        mock_document_service.ingest_document_with_total = self._ingests(([1, 2], 2))
+
+        await self.documents.ingest_document(self._request())
+        response = await self.documents.ingest_document(self._request())
+
+        assert "already ingested" in response.message
+        assert "[1, 2]" in response.message
+        assert mock_document_service.ingest_document_with_total.await_count == 1
+
+    @patch("python.ghostwire.api.v1.documents.document_service")
+    async def test_partial_or_empty_ingest_not_cached(self, mock_document_service):
+        """Test that ingests missing chunks are retried instead of reused"""
+        mock_document_service.ingest_document_with_total = self._ingests(
+            ([1], 2), ([], 0), ([1, 2], 2)
+        )
+
+        for _ in range(3):
+            response = await self.documents.ingest_document(self._request())
+            assert "Successfully ingested" in response.message
+
+        assert mock_document_service.ingest_document_with_total.await_count == 3
+
+    @patch("python.ghostwire.api.v1.documents.time.monotonic")
+    @patch("python.ghostwire.api.v1.documents.document_service")
+    async def test_cached_ingest_expires(self, mock_document_service, mock_monotonic):
+        """Test that a cached ingest is ignored once INGEST_CACHE_TTL has passed"""
+        mock_document_service.ingest_document_with_total = self._ingests(([1], 1))
+        mock_monotonic.return_value = 1000.0
+        await self.documents.ingest_document(self._request())
+
+        mock_monotonic.return_value = 1000.0 + self.documents.INGEST_CACHE_TTL + 1
+        response = await self.documents.ingest_document(self._request())
+
+        assert "Successfully ingested" in response.message
+        assert mock_document_service.ingest_document_with_total.await_count == 2
+
+    @patch("python.ghostwire.api.v1.documents.INGEST_CACHE_SIZE", 1)
+    @patch("python.ghostwire.api.v1.documents.document_service")
+    async def test_oldest_ingest_evicted(self, mock_document_service):
+        """Test that the least recently ingested upload is evicted when full"""
+        mock_document_service.ingest_document_with_total = self._ingests(([1], 1))
+
+        await self.documents.ingest_document(self._request("First document."))
+        await self.documents.ingest_document(self._request("Second document."))
+        response = await self.documents.ingest_document(
+            self._request("First document.")
+        )
+
+        assert "Successfully ingested" in response.message
+        assert len(self.documents._ingest_cache) == 1
+        assert mock_document_service.ingest_document_with_total.await_count == 3
+
+    @patch("python.ghostwire.api.v1.documents.document_service")
+    async def test_reingest_after_collection_deleted(self, mock_document_service):
+        """Test that an upload is stored again once its session was deleted"""
+        from python.ghostwire.api.v1 import qdrant
+
+        mock_document_service.ingest_document_with_total = self._ingests(
+            ([1, 2], 2), ([3, 4], 2)
+        )
+
+        await self.documents.ingest_document(self._request())
+        with patch.object(qdrant, "memory_service", self.memory_service):
+            await qdrant.delete_collection("test_session")
+        response = await self.documents.ingest_document(self._request())
+
+        assert "Successfully ingested" in response.message
+        assert "[3, 4]" in response.message
+        assert mock_document_service.ingest_document_with_total.await_count == 2
+        assert self.stored_ids == {3, 4}
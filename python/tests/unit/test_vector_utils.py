@@ -5,7 +5,13 @@ Tests the vector normalization functionality with various edge cases.
 """
 
 import numpy as np
-from ghostwire.utils.vector_utils import normalize_vector
+import orjson
+from ghostwire.utils.vector_utils import (
+    PAIRWISE_GRAM_MAX_ROWS,
+    embedding_stability,
+    mean_pairwise_cosine,
+    normalize_vector,
+)
 
 
 class TestVectorNormalization:
@@ -126,3 +132,72 @@ class TestVectorNormalization:
         np.testing.assert_allclose(result, unit_vector, atol=1e-10)
         # Should still have unit length
         assert np.isclose(np.linalg.norm(result), 1.0, atol=1e-7)
+
+
+class TestMeanPairwiseCosine:
+    """Test suite for the mean_pairwise_cosine function."""
+
+    def test_identical_vectors_are_perfectly_similar(self):
+        """Test that repeated identical vectors score 1.0."""
+        vector = np.array([0.3, -1.2, 4.0])
+        assert np.isclose(mean_pairwise_cosine([vector] * 4), 1.0, atol=1e-6)
+
+    def test_fewer_than_two_vectors(self):
+        """Test that zero or one vector is treated as perfectly stable."""
+        assert mean_pairwise_cosine([]) == 1.0
+        assert mean_pairwise_cosine([np.array([1.0, 2.0])]) == 1.0
+
+    def test_matches_pairwise_loop(self):
+        """Test that the result equals the mean of every distinct pair."""
+        np.random.seed(7)
+        vectors = [np.random.rand(16) for _ in range(5)]
+        expected = np.mean(
+            [
+                np.dot(vectors[i], vectors[j])
+                / (np.linalg.norm(vectors[i]) * np.linalg.norm(vectors[j]))
+                for i in range(len(vectors))
+                for j in range(i + 1, len(vectors))
+            ]
+        )
+
+        assert np.isclose(mean_pairwise_cosine(vectors), expected, atol=1e-6)
+
+    def test_large_input_matches_gram_matrix(self):
+        """Test that the O(N * D) path agrees with the full similarity matrix."""
+        np.random.seed(11)
+        vectors = np.random.randn(PAIRWISE_GRAM_MAX_ROWS + 88, 32) + 0.5
+        unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        similarities = unit @ unit.T
+        expected = similarities[np.triu_indices(len(unit), k=1)].mean()
+
+        assert np.isclose(mean_pairwise_cosine(vectors), expected, atol=1e-5)
+
+
+def embedding_body(*embeddings: list[float]) -> bytes:
+    """OpenAI-style embedding response body holding the given embeddings"""
+    return orjson.dumps({"data": [{"embedding": e} for e in embeddings]})
+
+
+class TestEmbeddingStability:
+    """Test suite for the embedding_stability function."""
+
+    def test_scores_embeddings_across_bodies(self):
+        """Test that embeddings from every body are scored together."""
+        bodies = [embedding_body([1.0, 0.0]), embedding_body([0.0, 1.0], [1.0, 0.0])]
+
+        stability, n_valid = embedding_stability(bodies, limit=3)
+
+        assert n_valid == 3
+        assert np.isclose(stability, mean_pairwise_cosine([[1, 0], [0, 1], [1, 0]]))
+
+    def test_stops_at_limit(self):
+        """Test that embeddings past the limit are ignored."""
+        body = embedding_body([1.0, 0.0], [1.0, 0.0], [0.0, 1.0])
+
+        assert embedding_stability([body], limit=2) == (1.0, 2)
+
+    def test_skips_empty_and_unusable_bodies(self):
+        """Test that empty embeddings and malformed bodies are skipped."""
+        bodies = [b"not json", b"[]", embedding_body([]), embedding_body([2.0, 2.0])]
+
+        assert embedding_stability(bodies, limit=4) == (1.0, 1)